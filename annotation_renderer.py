@@ -0,0 +1,471 @@
+"""
+Annotation Renderer - Cached label sprites and batched overlay drawing
+
+Every fixed piece of the capture UI (face and smile labels, the countdown
+digit at each pulse step with its circle, shadow and glow, the capture
+message, the header title, the header/footer gradients) is rasterized once
+into a colour + alpha sprite and afterwards only blitted with NumPy.
+Face and smile boxes for all faces are filled as rings with one
+cv2.fillPoly call per colour, from outlines computed for every face in one
+NumPy expression. Labels are copied with cv2.copyTo, which for sprites this
+small beats any gathered NumPy composite.
+"""
+
+import cv2
+import numpy as np
+
+
+class Sprite:
+    """
+    Pre-rendered overlay: a colour image, its coverage mask and an anchor.
+
+    The anchor is the pixel of the sprite that lands on the blit position,
+    e.g. the text origin for a label or the circle centre for the countdown.
+    """
+
+    __slots__ = ('color', 'mask', 'anchor', 'text_size')
+
+    def __init__(self, color, mask, anchor, text_size=None):
+        self.color = color
+        self.mask = mask
+        self.anchor = anchor
+        self.text_size = text_size
+
+
+class _Canvas:
+    """Scratch surface that draws every primitive into a colour and a mask plane."""
+
+    def __init__(self, width, height):
+        self.color = np.zeros((height, width, 3), dtype=np.uint8)
+        self.mask = np.zeros((height, width), dtype=np.uint8)
+
+    def text(self, text, org, font, scale, color, thickness):
+        cv2.putText(self.color, text, org, font, scale, color, thickness)
+        cv2.putText(self.mask, text, org, font, scale, 255, thickness)
+
+    def circle(self, center, radius, color, thickness):
+        cv2.circle(self.color, center, radius, color, thickness)
+        cv2.circle(self.mask, center, radius, 255, thickness)
+
+    def rectangle(self, pt1, pt2, color, thickness):
+        cv2.rectangle(self.color, pt1, pt2, color, thickness)
+        cv2.rectangle(self.mask, pt1, pt2, 255, thickness)
+
+    def to_sprite(self, anchor, text_size=None):
+        """Crop to the drawn pixels and return the finished sprite."""
+        ys, xs = np.nonzero(self.mask)
+        if len(xs) == 0:
+            return Sprite(self.color[:1, :1].copy(), self.mask[:1, :1].copy(), (0, 0), text_size)
+        x0, x1 = xs.min(), xs.max() + 1
+        y0, y1 = ys.min(), ys.max() + 1
+        return Sprite(self.color[y0:y1, x0:x1].copy(), self.mask[y0:y1, x0:x1].copy(),
+                      (anchor[0] - x0, anchor[1] - y0), text_size)
+
+
+def blit(frame, sprite, x, y, opacity=1.0):
+    """
+    Draw a sprite onto the frame with its anchor at (x, y).
+
+    Args:
+        frame: The video frame to draw on
+        sprite: Sprite to draw
+        x, y: Frame position of the sprite's anchor
+        opacity: 1.0 copies the covered pixels, less blends them
+    """
+    frame_h, frame_w = frame.shape[:2]
+    sprite_h, sprite_w = sprite.mask.shape
+    left = x - sprite.anchor[0]
+    top = y - sprite.anchor[1]
+
+    # Clip the sprite against the frame edges
+    sx0, sy0 = max(0, -left), max(0, -top)
+    sx1, sy1 = min(sprite_w, frame_w - left), min(sprite_h, frame_h - top)
+    if sx1 <= sx0 or sy1 <= sy0:
+        return
+
+    roi = frame[top + sy0:top + sy1, left + sx0:left + sx1]
+    color = sprite.color[sy0:sy1, sx0:sx1]
+    mask = sprite.mask[sy0:sy1, sx0:sx1]
+
+    # Masked copies run in OpenCV's vectorized kernels, not per pixel in Python
+    if opacity < 1.0:
+        color = cv2.addWeighted(color, opacity, roi, 1.0 - opacity, 0)
+    cv2.copyTo(color, mask, roi)
+
+
+def blit_many(frame, sprite, positions):
+    """
+    Draw the same sprite at many anchor positions.
+
+    Args:
+        frame: The video frame to draw on
+        sprite: Sprite to draw
+        positions: Sequence of (x, y) anchor positions
+    """
+    for x, y in positions:
+        blit(frame, sprite, x, y)
+
+
+def text_sprite(text, font, scale, layers, measure_thickness=None):
+    """
+    Rasterize layered text (e.g. a thick white outline under a coloured fill).
+
+    Args:
+        text: Text to draw
+        font: OpenCV Hershey font
+        scale: Font scale
+        layers: Sequence of (color, thickness) pairs, bottom layer first
+        measure_thickness: Thickness used for text_size (the value callers centre with)
+
+    Returns:
+        Sprite anchored at the text origin
+    """
+    max_thickness = max(thickness for _, thickness in layers)
+    (width, height), baseline = cv2.getTextSize(text, font, scale, max_thickness)
+    pad = max_thickness + 2
+    canvas = _Canvas(width + 2 * pad, height + baseline + 2 * pad)
+    origin = (pad, pad + height)
+
+    for color, thickness in layers:
+        canvas.text(text, origin, font, scale, color, thickness)
+
+    if measure_thickness is None:
+        measure_thickness = max_thickness
+    text_size = cv2.getTextSize(text, font, scale, measure_thickness)[0]
+    return canvas.to_sprite(origin, text_size)
+
+
+RING_SHIFT = 4  # Fractional bits of the ring outlines (sub-pixel edges)
+
+
+def _rounded_ring_template(radius, thickness, grow=0):
+    """
+    Precompute the outline pair of a rounded-rectangle ring of any box.
+
+    A ring is filled between two rounded rectangles with the same corner
+    centres and radii radius +/- thickness / 2, which draws exactly what a
+    stroked outline of that thickness covers. Each outline point is a fixed
+    offset plus a selector of the box width and height, so the outlines of
+    every face in a frame come out of one broadcast expression:
+
+        points = offset + ((x, y) + select * (w, h)) << RING_SHIFT
+
+    Args:
+        radius: Corner radius of the stroke centre line
+        thickness: Stroke thickness in pixels
+        grow: Pixels the ring sits outside the face box
+
+    Returns:
+        (offset, select) arrays of shape (2, points, 2)
+    """
+    offsets = []
+    for ring_radius in (radius + thickness / 2.0, radius - thickness / 2.0):
+        points = []
+        selects = []
+        # Top-left, top-right, bottom-right, bottom-left - walked clockwise
+        for angle, select in ((180, (0, 0)), (270, (1, 0)), (0, (1, 1)), (90, (0, 1))):
+            theta = np.deg2rad(np.arange(angle, angle + 91, 15))
+            centre = np.array([radius - grow, radius - grow]) + np.array(select) * (-2 * radius + 2 * grow)
+            points.append(centre + ring_radius * np.stack([np.cos(theta), np.sin(theta)], axis=1))
+            selects.append(np.tile(select, (len(theta), 1)))
+        offsets.append(np.concatenate(points))
+    offset = np.round(np.stack(offsets) * (1 << RING_SHIFT)).astype(np.int32)
+    return offset, np.stack([np.concatenate(selects)] * 2).astype(np.int32)
+
+
+def _rect_ring_template(thickness, grow=0):
+    """Same as _rounded_ring_template for a plain rectangle (the smile boxes)."""
+    corners = np.array([(0, 0), (1, 0), (1, 1), (0, 1)], dtype=np.int32)
+    outward = (corners * 2 - 1).astype(np.float64)
+    offsets = [outward * (grow + thickness / 2.0), outward * (grow - thickness / 2.0)]
+    offset = np.round(np.stack(offsets) * (1 << RING_SHIFT)).astype(np.int32)
+    return offset, np.stack([corners, corners])
+
+
+def _ring_outlines(template, boxes):
+    """Outline pairs for every box, as the list cv2.fillPoly takes."""
+    offset, select = template
+    anchors = boxes[:, None, None, :2] + select[None] * boxes[:, None, None, 2:]
+    outlines = offset[None] + (anchors << RING_SHIFT)
+    return list(outlines.reshape(-1, offset.shape[1], 2))
+
+
+class AnnotationRenderer:
+    """
+    Draws the Capture Smile AI overlays from cached sprites.
+
+    Sprites that depend on the frame width (gradient bars) are rebuilt when
+    the width changes; text whose content varies (photo counter, status line)
+    goes through a small cache keyed by the text.
+
+    Setting `effects` to False (the load shedder does this under pressure)
+    drops the gradient bars, the glow/shadow/pulse of the countdown and the
+    translucent message box, leaving only the text.
+    """
+
+    TEXT_CACHE_LIMIT = 128
+
+    def __init__(self):
+        font = cv2.FONT_HERSHEY_SIMPLEX
+        self.face_label = text_sprite("FACE DETECTED", font, 0.5,
+                                      [((255, 255, 255), 2), ((100, 255, 255), 1)], measure_thickness=1)
+        self.smile_icon = text_sprite("^_^", font, 0.6,
+                                      [((255, 255, 255), 2), ((255, 100, 255), 1)], measure_thickness=2)
+        self.title = text_sprite("CAPTURE SMILE AI", cv2.FONT_HERSHEY_DUPLEX, 1.2,
+                                 [((255, 255, 255), 3), ((100, 200, 255), 2)])
+        self.instruction = text_sprite("Press 'Q' to Quit  |  Smile to Capture", font, 0.5,
+                                       [((200, 200, 200), 1)])
+
+        self._face_outer = _rounded_ring_template(20, 3, grow=2)
+        self._face_inner = _rounded_ring_template(18, 2)
+        self._smile_outer = _rect_ring_template(3, grow=2)
+        self._smile_inner = _rect_ring_template(2)
+        self._countdown = {}
+        self._messages = {}
+        self._texts = {}
+        self._header = None
+        self._footer = None
+        self.effects = True
+
+    def draw_faces(self, frame, faces, face_smiles):
+        """
+        Draw face boxes, labels and smile markers for every face.
+
+        Args:
+            frame: The video frame to draw on
+            faces: Face rectangles (x, y, w, h)
+            face_smiles: Smile rectangles for each face (relative to the face)
+
+        Returns:
+            smile_flags: One boolean per face indicating if that face is smiling
+        """
+        if len(faces) == 0:
+            return []
+
+        boxes = np.asarray(faces, dtype=np.int32).reshape(-1, 4)
+
+        # All face outlines in two calls: outer glow, then inner border
+        cv2.fillPoly(frame, _ring_outlines(self._face_outer, boxes), (255, 200, 100), cv2.LINE_8, RING_SHIFT)
+        cv2.fillPoly(frame, _ring_outlines(self._face_inner, boxes), (255, 255, 100), cv2.LINE_8, RING_SHIFT)
+
+        x, y, w, h = boxes.T
+        label_x = x + (w - self.face_label.text_size[0]) // 2
+        shown = y - 10 > 20
+        blit_many(frame, self.face_label, zip(label_x[shown].tolist(), (y[shown] - 10).tolist()))
+
+        counts = [len(smiles) for smiles in face_smiles]
+        smile_flags = [count > 0 for count in counts]
+        if any(smile_flags):
+            # Smile boxes of every face in frame coordinates: (M, 4)
+            smiles = np.concatenate([np.asarray(s, dtype=np.int32).reshape(-1, 4) for s in face_smiles if len(s)])
+            owners = boxes[np.repeat(np.arange(len(boxes)), counts)]
+            smiles[:, :2] += owners[:, :2]
+            cv2.fillPoly(frame, _ring_outlines(self._smile_outer, smiles), (200, 100, 255), cv2.LINE_8, RING_SHIFT)
+            cv2.fillPoly(frame, _ring_outlines(self._smile_inner, smiles), (255, 150, 255), cv2.LINE_8, RING_SHIFT)
+
+            sx, sy, sw, sh = smiles.T
+            icon_y = sy + sh + 20
+            shown = icon_y - owners[:, 1] < owners[:, 3] - 5
+            icon_x = sx + (sw - self.smile_icon.text_size[0]) // 2
+            blit_many(frame, self.smile_icon, zip(icon_x[shown].tolist(), icon_y[shown].tolist()))
+
+        return smile_flags
+
+    def _cached_text(self, text, font, scale, layers, measure_thickness=None):
+        key = (text, font, scale, tuple(layers), measure_thickness)
+        sprite = self._texts.get(key)
+        if sprite is None:
+            if len(self._texts) >= self.TEXT_CACHE_LIMIT:
+                self._texts.clear()
+            sprite = text_sprite(text, font, scale, layers, measure_thickness)
+            self._texts[key] = sprite
+        return sprite
+
+    @staticmethod
+    def _gradient(height, width, colors):
+        strip = np.empty((height, width, 3), dtype=np.uint8)
+        strip[:] = np.asarray(colors, dtype=np.uint8)[:, None, :]
+        return strip
+
+    @staticmethod
+    def _blend_strip(frame, top, strip):
+        # Only the bar rows are blended, not a copy of the whole frame
+        rows = frame[top:top + strip.shape[0]]
+        cv2.addWeighted(strip[:rows.shape[0]], 0.8, rows, 0.2, 0, dst=rows)
+
+    def draw_header(self, frame, photos_captured):
+        """
+        Draw the header bar with app title and photo counter.
+
+        Args:
+            frame: The video frame to draw on
+            photos_captured: Number of photos captured so far
+        """
+        width = frame.shape[1]
+        if self._header is None or self._header.shape[1] != width:
+            # Rows 0-79 follow the gradient; row 80 repeats the last colour
+            colors = [(40 + int(20 * i / 80),) * 2 + (60,) for i in range(80)]
+            self._header = self._gradient(81, width, colors + colors[-1:])
+        if self.effects:
+            self._blend_strip(frame, 0, self._header)
+
+        blit(frame, self.title, 20, 45)
+
+        counter = self._cached_text(f"Photos: {photos_captured}", cv2.FONT_HERSHEY_SIMPLEX, 0.8,
+                                    [((255, 255, 255), 2)])
+        blit(frame, counter, width - counter.text_size[0] - 20, 45)
+
+    def draw_footer(self, frame, status_text):
+        """
+        Draw the footer bar with status and instructions.
+
+        Args:
+            frame: The video frame to draw on
+            status_text: Current status message to display
+        """
+        height, width = frame.shape[:2]
+        footer_y = height - 70
+        if self._footer is None or self._footer.shape[1] != width:
+            colors = [(60 - int(20 * i / 70),) * 2 + (40,) for i in range(70)]
+            self._footer = self._gradient(70, width, colors)
+        if self.effects:
+            self._blend_strip(frame, footer_y, self._footer)
+
+        status = self._cached_text(status_text, cv2.FONT_HERSHEY_SIMPLEX, 0.9, [((100, 255, 100), 2)])
+        blit(frame, status, (width - status.text_size[0]) // 2, footer_y + 30)
+        blit(frame, self.instruction, (width - self.instruction.text_size[0]) // 2, footer_y + 55)
+
+    @staticmethod
+    def _countdown_sprite(value, step, effects=True):
+        pulse = 1.0 + (0.3 * step / 10)
+        font = cv2.FONT_HERSHEY_DUPLEX
+        font_scale = 8.0 * pulse
+        thickness = int(15 * pulse)
+        colors = {
+            3: (100, 255, 100),   # Green for 3
+            2: (100, 200, 255),   # Yellow for 2
+            1: (100, 100, 255)    # Red for 1
+        }
+        color = colors.get(value, (100, 255, 100))
+
+        text = str(value)
+        text_w, text_h = cv2.getTextSize(text, font, font_scale, thickness)[0]
+        ready_text = "GET READY!"
+        ready_w = cv2.getTextSize(ready_text, font, 1.2, 2)[0][0]
+        circle_radius = int(150 * pulse)
+
+        # Canvas centred on the circle, tall enough for "GET READY!" below
+        half = max(circle_radius + 25, text_w // 2 + 20, ready_w // 2 + 10)
+        canvas = _Canvas(2 * half, 2 * half + text_h + 140)
+        cx, cy = half, half
+        text_x = cx - text_w // 2
+        text_y = cy + text_h // 2
+
+        # Glowing circle background
+        canvas.circle((cx, cy), circle_radius + 20, (50, 50, 50), -1)
+        if effects:
+            canvas.circle((cx, cy), circle_radius + 15, color, 5)
+            canvas.circle((cx, cy), circle_radius + 10, (255, 255, 255), 2)
+
+            # Shadow and outer glow
+            canvas.text(text, (text_x + 5, text_y + 5), font, font_scale, (0, 0, 0), thickness + 8)
+            canvas.text(text, (text_x, text_y), font, font_scale, (255, 255, 255), thickness + 4)
+
+        # Main number
+        canvas.text(text, (text_x, text_y), font, font_scale, color, thickness)
+
+        ready_x = cx - ready_w // 2
+        ready_y = text_y + 100
+        canvas.text(ready_text, (ready_x, ready_y), font, 1.2, (255, 255, 255), 3)
+        canvas.text(ready_text, (ready_x, ready_y), font, 1.2, (100, 255, 255), 2)
+
+        return canvas.to_sprite((cx, cy))
+
+    def draw_countdown(self, frame, countdown_value, countdown_frames):
+        """
+        Draw the animated countdown number (3, 2, 1).
+
+        Args:
+            frame: The video frame to draw on
+            countdown_value: The countdown number to display
+            countdown_frames: Current frame count for pulse animation
+        """
+        if countdown_value <= 0:
+            return
+
+        # The pulse only ever takes 11 sizes, so each one is rendered once
+        step = abs((countdown_frames % 20) - 10) if self.effects else 0
+        key = (countdown_value, step, self.effects)
+        sprite = self._countdown.get(key)
+        if sprite is None:
+            sprite = self._countdown_sprite(countdown_value, step, self.effects)
+            self._countdown[key] = sprite
+
+        height, width = frame.shape[:2]
+        blit(frame, sprite, width // 2, height // 2)
+
+    def _message_sprites(self, message):
+        sprites = self._messages.get(message)
+        if sprites is not None:
+            return sprites
+
+        font = cv2.FONT_HERSHEY_DUPLEX
+        font_scale = 2.0
+        thickness = 4
+        (text_w, text_h) = cv2.getTextSize(message, font, font_scale, thickness)[0]
+        checkmark = "✓"
+        check_w = cv2.getTextSize(checkmark, font, 2.0, 4)[0][0]
+
+        # Background box around the text, blended at draw time
+        padding = 20
+        box = _Canvas(text_w + 2 * padding + 8, text_h + 2 * padding + 8)
+        box.rectangle((2, 2), (text_w + 2 * padding + 2, text_h + 2 * padding + 2), (50, 200, 50), -1)
+        box.rectangle((2, 2), (text_w + 2 * padding + 2, text_h + 2 * padding + 2), (100, 255, 100), 3)
+        box_sprite = box.to_sprite((padding + 2, text_h + padding + 2))
+
+        # Checkmark plus text with shadow and glow, always opaque
+        left = check_w + 40
+        canvas = _Canvas(left + text_w + 20, text_h + 60)
+        origin = (left, text_h + 15)
+        canvas.text(checkmark, (origin[0] - check_w - 30, origin[1]), font, 2.0, (100, 255, 100), 6)
+        canvas.text(message, (origin[0] + 2, origin[1] + 2), font, font_scale, (0, 0, 0), thickness + 2)
+        canvas.text(message, origin, font, font_scale, (255, 255, 255), thickness)
+        canvas.text(message, origin, font, font_scale, (100, 255, 100), thickness - 1)
+        text_sprite_ = canvas.to_sprite(origin, (text_w, text_h))
+
+        sprites = (box_sprite, text_sprite_)
+        self._messages[message] = sprites
+        return sprites
+
+    def draw_message(self, frame, message, duration_counter, max_duration=30):
+        """
+        Draw the fading success message.
+
+        Args:
+            frame: The video frame to draw on
+            message: Text message to display
+            duration_counter: Current frame count for the message
+            max_duration: How many frames to show the message
+
+        Returns:
+            Updated duration_counter
+        """
+        if duration_counter <= 0:
+            return 0
+
+        # Fade-in fade-out effect
+        if duration_counter > max_duration - 10:
+            alpha = (max_duration - duration_counter) / 10
+        elif duration_counter < 10:
+            alpha = duration_counter / 10
+        else:
+            alpha = 1.0
+
+        box_sprite, text_sprite_ = self._message_sprites(message)
+        text_x = (frame.shape[1] - text_sprite_.text_size[0]) // 2
+        text_y = 150
+        if alpha > 0 and self.effects:
+            blit(frame, box_sprite, text_x, text_y, opacity=0.7 * alpha)
+        blit(frame, text_sprite_, text_x, text_y)
+
+        return duration_counter - 1
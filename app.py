@@ -2,10 +2,22 @@ from flask import Flask, render_template, Response, jsonify
 import cv2
 import numpy as np
 import os
+import time
 from datetime import datetime
 
+from frame_bus import open_capture
+from frame_trace import tracer_from_env
+from load_shedding import LoadShedder
+
 app = Flask(__name__)
 
+# Set SMILE_TRACE=trace.json to record a frame timeline (dumped on exit or via /trace)
+tracer = tracer_from_env()
+
+# Shared by every viewer's stream; SMILE_TARGET_FPS=0 turns load shedding off
+target_fps = float(os.environ.get('SMILE_TARGET_FPS', 30))
+shedder = LoadShedder(target_fps=target_fps or 30, enabled=target_fps > 0)
+
 # Create folders
 if not os.path.exists('static/captured_smiles'):
     os.makedirs('static/captured_smiles')
@@ -14,32 +26,62 @@ class SmileDetector:
     def __init__(self):
         self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
         self.smile_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_smile.xml')
-        self.cap = cv2.VideoCapture(0)
+        self.cap = open_capture(0)
         self.photo_count = 0
+        self.frame_seq = 0
     
     def generate_frames(self):
+        smiling = []  # Per-face smile results, reused on frames that skip the smile cascade
+        stream_frames = 0  # This viewer's own frame count - frame_seq is shared by all viewers
         while True:
-            success, frame = self.cap.read()
+            self.frame_seq += 1
+            seq = self.frame_seq
+            stream_frames += 1
+            
+            with tracer.span("capture", seq):
+                success, frame = self.cap.read()
             if not success:
                 break
+            captured_at = time.time()
             
-            # Face and smile detection
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
+            started = time.perf_counter()
+            load = shedder.settings
+            scale = load['detect_scale']
             
-            for (x, y, w, h) in faces:
-                cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
-                roi_gray = gray[y:y+h, x:x+w]
-                
-                smiles = self.smile_cascade.detectMultiScale(roi_gray, 1.8, 20, minSize=(25, 15))
-                if len(smiles) > 0:
-                    cv2.putText(frame, "SMILE DETECTED!", (x, y-10), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+            # Face and smile detection (on a smaller copy when shedding load)
+            with tracer.span("grayscale", seq):
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                if scale < 1.0:
+                    gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            with tracer.span("face_cascade", seq):
+                faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
             
-            ret, buffer = cv2.imencode('.jpg', frame)
+            # Under load the smile cascade only runs every few frames (or when the faces change)
+            if stream_frames % load['smile_every'] == 0 or len(smiling) != len(faces):
+                smiling = []
+                for (x, y, w, h) in faces:
+                    roi_gray = gray[y:y+h, x:x+w]
+                    with tracer.span("smile_cascade", seq):
+                        smiles = self.smile_cascade.detectMultiScale(roi_gray, 1.8, 20, minSize=(25, 15))
+                    smiling.append(len(smiles) > 0)
+            
+            with tracer.span("face_overlay", seq):
+                for (x, y, w, h), smile in zip(faces, smiling):
+                    x, y, w, h = (int(v / scale) for v in (x, y, w, h))
+                    cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
+                    if smile:
+                        cv2.putText(frame, "SMILE DETECTED!", (x, y-10),
+                                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+            
+            with tracer.span("encode", seq):
+                ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, load['jpeg_quality']])
+            shedder.update(time.perf_counter() - started)
             frame = buffer.tobytes()
+            # X-Frame-Time lets clients (load_test.py) measure end-to-end frame age
             yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+                   b'Content-Type: image/jpeg\r\n'
+                   b'Content-Length: %d\r\n'
+                   b'X-Frame-Time: %.6f\r\n\r\n' % (len(frame), captured_at) + frame + b'\r\n')
 
 detector = SmileDetector()
 
@@ -59,7 +101,8 @@ def capture_photo():
         if success:
             filename = f"smile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
             filepath = f"static/captured_smiles/{filename}"
-            cv2.imwrite(filepath, frame)
+            with tracer.span("disk_write"):
+                cv2.imwrite(filepath, frame)
             detector.photo_count += 1
             return jsonify({
                 'success': True, 
@@ -70,5 +113,15 @@ def capture_photo():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/status')
+def status():
+    return jsonify({'photo_count': detector.photo_count, 'load_shedding': shedder.status()})
+
+@app.route('/trace')
+def trace_timeline():
+    if not tracer.enabled:
+        return jsonify({'success': False, 'error': 'Tracing is disabled (set SMILE_TRACE)'}), 404
+    return jsonify(tracer.to_chrome_trace())
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
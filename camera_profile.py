@@ -0,0 +1,116 @@
+"""
+Camera Profile - Apply a measured capture mode at startup
+
+A profile is a small JSON file written by `python camera_test.py --probe`.
+It pins the resolution, frame rate, pixel format (FOURCC) and driver buffer
+size instead of taking whatever the driver defaults to, and records how
+wide the detection preview should be:
+
+    {
+        "device": 0,
+        "width": 1920, "height": 1080, "fps": 30,
+        "fourcc": "MJPG",
+        "buffer_size": 1,
+        "detection_width": 640
+    }
+
+With detection_width set, the camera runs at full resolution for saved
+stills while face/smile detection runs on a downscaled copy of each frame.
+"""
+
+import json
+import os
+
+import cv2
+
+
+DEFAULT_PROFILE_PATH = 'camera_profile.json'
+
+
+def load_profile(path=DEFAULT_PROFILE_PATH):
+    """
+    Read a camera profile.
+
+    Args:
+        path: Profile JSON file
+
+    Returns:
+        Profile dictionary, or None if the file does not exist
+    """
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_profile(profile, path=DEFAULT_PROFILE_PATH):
+    """Write a camera profile as JSON."""
+    with open(path, 'w') as f:
+        json.dump(profile, f, indent=2)
+    print(f"Camera profile saved: {path}")
+
+
+def fourcc_to_str(value):
+    """Decode the CAP_PROP_FOURCC number into its four characters."""
+    value = int(value)
+    return ''.join(chr((value >> (8 * i)) & 0xFF) for i in range(4)).strip('\x00')
+
+
+def apply_mode(camera, width=None, height=None, fps=None, fourcc=None, buffer_size=None):
+    """
+    Request a capture mode from the driver.
+
+    FOURCC goes first: many UVC drivers only offer the larger sizes in MJPG.
+
+    Returns:
+        The mode the driver actually granted, as a dictionary
+    """
+    if fourcc:
+        camera.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+    if width:
+        camera.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    if height:
+        camera.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    if fps:
+        camera.set(cv2.CAP_PROP_FPS, fps)
+    if buffer_size is not None:
+        # A short driver queue means read() hands back a fresh frame, not a stale one
+        camera.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+    return current_mode(camera)
+
+
+def current_mode(camera):
+    """Return the capture mode the driver reports."""
+    return {
+        'width': int(camera.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        'height': int(camera.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        'fps': round(camera.get(cv2.CAP_PROP_FPS), 2),
+        'fourcc': fourcc_to_str(camera.get(cv2.CAP_PROP_FOURCC)),
+    }
+
+
+def apply_profile(camera, profile):
+    """
+    Configure an opened camera from a profile.
+
+    Args:
+        camera: cv2.VideoCapture
+        profile: Profile dictionary
+
+    Returns:
+        The mode the driver actually granted
+    """
+    return apply_mode(camera, profile.get('width'), profile.get('height'), profile.get('fps'),
+                      profile.get('fourcc'), profile.get('buffer_size'))
+
+
+def detection_scale(profile, frame_width):
+    """
+    Scale factor from the captured frame to the detection preview.
+
+    Returns:
+        A value in (0, 1]; 1.0 means detect on the full frame
+    """
+    if not profile or not profile.get('detection_width') or frame_width <= 0:
+        return 1.0
+    return min(1.0, profile['detection_width'] / frame_width)
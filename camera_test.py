@@ -1,19 +1,234 @@
+"""
+Camera Test - Live preview and capture-mode probe
+
+    python camera_test.py                 # live preview (press Q to close)
+    python camera_test.py --list          # list the modes the camera accepts
+    python camera_test.py --probe         # measure every mode and write camera_profile.json
+
+OpenCV cannot enumerate a camera's modes directly, so the probe requests
+each common resolution / FPS / FOURCC combination and keeps the ones the
+driver actually grants. For each mode it measures delivered FPS, frame
+interval jitter, how long grab() waits for a frame and how long retrieve()
+takes to decode it. The profile keeps the mode with the cheapest decode
+that is still as wide as --still-width.
+"""
+
+import argparse
+import time
+
 import cv2
+import numpy as np
+
+from camera_profile import DEFAULT_PROFILE_PATH, apply_mode, current_mode, save_profile
+
+
+CANDIDATE_SIZES = [(640, 480), (800, 600), (1280, 720), (1920, 1080), (2560, 1440), (3840, 2160)]
+CANDIDATE_FPS = [30, 60]
+CANDIDATE_FOURCCS = ['MJPG', 'YUYV']
+DECODE_BUCKET_MS = 2.0  # Decode times this close count as a tie
+
+
+def preview(device=0):
+    cap = cv2.VideoCapture(device)
+
+    if cap.isOpened():
+        print("✅ Camera connected!")
+
+        while True:
+            ret, frame = cap.read()
+            if ret:
+                cv2.imshow('Camera Test - PRESS Q TO CLOSE', frame)
+
+            # Q press karo to quit
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+        cap.release()
+        cv2.destroyAllWindows()
+    else:
+        print("❌ Camera not working!")
+
+
+def list_modes(cap):
+    """
+    Find the distinct modes the driver grants for the candidate requests.
+
+    Returns:
+        List of mode dictionaries (width, height, fps, fourcc)
+    """
+    modes = []
+    for fourcc in CANDIDATE_FOURCCS:
+        for width, height in CANDIDATE_SIZES:
+            for fps in CANDIDATE_FPS:
+                granted = apply_mode(cap, width, height, fps, fourcc)
+                # Drivers silently fall back to the nearest mode they support
+                if granted['width'] != width or granted['height'] != height or granted['fourcc'] != fourcc:
+                    continue
+                if granted not in modes:
+                    modes.append(granted)
+    return modes
+
+
+def measure_mode(cap, mode, frames=90, warmup=15, buffer_size=1):
+    """
+    Measure what a mode really delivers.
+
+    Args:
+        cap: Opened cv2.VideoCapture
+        mode: Mode dictionary from list_modes
+        frames: Frames to time
+        warmup: Frames to discard first (auto exposure, driver queue)
+        buffer_size: CAP_PROP_BUFFERSIZE to request
+
+    grab() and retrieve() are timed separately: with a one-frame buffer grab()
+    mostly waits for the next frame (about 1000/fps for any mode that keeps
+    up), while retrieve() is the decode and colour conversion paid on every
+    frame.
+
+    Returns:
+        Dictionary with delivered fps, interval jitter, grab() wait and
+        retrieve() decode time in ms
+    """
+    apply_mode(cap, mode['width'], mode['height'], mode['fps'], mode['fourcc'], buffer_size)
+    for _ in range(warmup):
+        cap.read()
+
+    stamps = []
+    grab_times = []
+    decode_times = []
+    failures = 0
+    for _ in range(frames):
+        start = time.perf_counter()
+        ok = cap.grab()
+        grabbed = time.perf_counter()
+        if ok:
+            ok, _ = cap.retrieve()
+        end = time.perf_counter()
+        if not ok:
+            failures += 1
+            continue
+        stamps.append(grabbed)
+        grab_times.append((grabbed - start) * 1000.0)
+        decode_times.append((end - grabbed) * 1000.0)
+
+    if len(stamps) < 2:
+        return {'delivered_fps': 0.0, 'interval_ms': None, 'jitter_ms': None, 'grab_ms': None,
+                'decode_ms': None, 'decode_p95_ms': None, 'failures': failures}
 
-cap = cv2.VideoCapture(0)
-
-if cap.isOpened():
-    print("✅ Camera connected!")
-    
-    while True:
-        ret, frame = cap.read()
-        if ret:
-            cv2.imshow('Camera Test - PRESS Q TO CLOSE', frame)
-        
-        # Q press karo to quit
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
+    intervals = np.diff(stamps) * 1000.0
+    return {
+        'delivered_fps': round((len(stamps) - 1) / (stamps[-1] - stamps[0]), 2),
+        'interval_ms': round(float(np.mean(intervals)), 2),
+        'jitter_ms': round(float(np.std(intervals)), 2),
+        'grab_ms': round(float(np.mean(grab_times)), 2),
+        'decode_ms': round(float(np.mean(decode_times)), 2),
+        'decode_p95_ms': round(float(np.percentile(decode_times, 95)), 2),
+        'failures': failures,
+    }
+
+
+def choose_profile(results, target_fps, detection_width, still_width=None):
+    """
+    Pick the mode with the cheapest decode that keeps up with the target
+    frame rate and is at least still_width pixels wide.
+
+    Decode time is paid on every frame, so a bigger mode than the stills
+    need only adds latency. Decode times within DECODE_BUCKET_MS count as a
+    tie, which goes to the fewest pixels, then the least jitter. If no mode
+    is wide enough, the widest usable one wins.
+    """
+    usable = [r for r in results if r['delivered_fps'] >= 0.9 * target_fps] or results
+    if still_width:
+        wide_enough = [r for r in usable if r['width'] >= still_width]
+        usable = wide_enough or [r for r in usable if r['width'] == max(m['width'] for m in usable)]
+
+    def cost(r):
+        decode = round(r['decode_ms'] / DECODE_BUCKET_MS) if r['decode_ms'] is not None else float('inf')
+        return decode, r['width'] * r['height'], r['jitter_ms'] or 0
+
+    best = min(usable, key=cost)
+    return {
+        'width': best['width'],
+        'height': best['height'],
+        'fps': best['fps'],
+        'fourcc': best['fourcc'],
+        'buffer_size': 1,
+        'detection_width': detection_width if best['width'] > detection_width else None,
+        'measured': {key: best[key] for key in ('delivered_fps', 'jitter_ms', 'grab_ms', 'decode_ms', 'decode_p95_ms')},
+    }
+
+
+def mode_label(mode):
+    return f"{mode['width']}x{mode['height']}@{mode['fps']:g} {mode['fourcc']}"
+
+
+def show_modes(device=0):
+    cap = cv2.VideoCapture(device)
+    if not cap.isOpened():
+        print("❌ Camera not working!")
+        return
+
+    print(f"Driver default mode: {mode_label(current_mode(cap))}")
+    for mode in list_modes(cap):
+        print(mode_label(mode))
+    cap.release()
+
+
+def probe(device=0, frames=90, target_fps=30, detection_width=640, output=DEFAULT_PROFILE_PATH, still_width=1280):
+    """
+    Measure every granted mode and save the best one as a camera profile.
+
+    Returns:
+        The saved profile, or None if nothing could be measured
+    """
+    cap = cv2.VideoCapture(device)
+    if not cap.isOpened():
+        print("❌ Camera not working!")
+        return None
+
+    print(f"Driver default mode: {mode_label(current_mode(cap))}")
+    modes = list_modes(cap)
+    if not modes:
+        print("No candidate mode was granted - keeping driver defaults")
+        cap.release()
+        return None
+
+    print(f"\n{'MODE':<26}{'FPS':>8}{'JITTER':>9}{'GRAB':>8}{'DECODE':>8}{'P95':>8}   (times in ms)")
+    results = []
+    for mode in modes:
+        stats = measure_mode(cap, mode, frames)
+        results.append(dict(mode, **stats))
+        print(f"{mode_label(mode):<26}{stats['delivered_fps']:>8}{stats['jitter_ms'] or '-':>9}"
+              f"{stats['grab_ms'] or '-':>8}{stats['decode_ms'] or '-':>8}{stats['decode_p95_ms'] or '-':>8}")
     cap.release()
-    cv2.destroyAllWindows()
-else:
-    print("❌ Camera not working!")
\ No newline at end of file
+
+    profile = choose_profile(results, target_fps, detection_width, still_width)
+    profile['device'] = device
+    print(f"\nSelected: {mode_label(profile)} (detection at {profile['detection_width'] or profile['width']}px wide)")
+    save_profile(profile, output)
+    return profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Camera preview and capture-mode probe")
+    parser.add_argument('--device', type=int, default=0, help="Camera index (default: 0)")
+    parser.add_argument('--list', action='store_true', help="List the modes the camera accepts")
+    parser.add_argument('--probe', action='store_true', help="Measure every mode and write a camera profile")
+    parser.add_argument('--frames', type=int, default=90, help="Frames timed per mode (default: 90)")
+    parser.add_argument('--target-fps', type=float, default=30, help="Frame rate the profile must sustain (default: 30)")
+    parser.add_argument('--detection-width', type=int, default=640,
+                        help="Width of the detection preview when capturing larger stills (default: 640)")
+    parser.add_argument('--still-width', type=int, default=1280,
+                        help="Smallest width the saved stills need; 0 takes the fastest mode (default: 1280)")
+    parser.add_argument('--output', default=DEFAULT_PROFILE_PATH, help="Profile file to write")
+    args = parser.parse_args()
+
+    if args.probe:
+        probe(args.device, args.frames, args.target_fps, args.detection_width, args.output, args.still_width)
+    elif args.list:
+        show_modes(args.device)
+    else:
+        preview(args.device)
+
+
+if __name__ == "__main__":
+    main()
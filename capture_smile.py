@@ -3,11 +3,28 @@ Capture Smile AI - Automatic Smile Detection and Photo Capture
 A beautiful, modern application with attractive UI/UX for real-time smile detection
 """
 
+import argparse
 import cv2
 import os
+import time
 import numpy as np
 from datetime import datetime
 
+from annotation_renderer import AnnotationRenderer
+from camera_profile import DEFAULT_PROFILE_PATH, apply_profile, detection_scale, load_profile
+from clip_recorder import ClipRecorder
+from event_log import (DEFAULT_MAX_BYTES, EventLog, STATE_CAPTURED, STATE_COUNTDOWN, STATE_DUPLICATE,
+                       STATE_IDLE, STATE_READY)
+from frame_bus import open_capture
+from frame_trace import FrameTracer, NULL_TRACER
+from group_smiles import ParallelSmileDetector, TriggerPolicy
+from load_shedding import LoadShedder
+from photo_dedupe import HASH_BITS, RecentCaptureIndex, capture_hash
+
+
+# Shared overlay renderer - sprites are rasterized once and reused every frame
+_renderer = AnnotationRenderer()
+
 
 def draw_header_bar(frame, photos_captured):
     """
@@ -17,31 +34,8 @@ def draw_header_bar(frame, photos_captured):
         frame: The video frame to draw on
         photos_captured: Number of photos captured so far
     """
-    height, width = frame.shape[:2]
-    
-    # Create gradient background for header (dark blue to lighter blue)
-    header_height = 80
-    overlay = frame.copy()
-    
-    # Draw gradient header
-    for i in range(header_height):
-        alpha = i / header_height
-        color_val = int(40 + (20 * alpha))
-        cv2.rectangle(overlay, (0, i), (width, i + 1), (color_val, color_val, 60), -1)
-    
-    # Blend overlay with frame
-    cv2.addWeighted(overlay, 0.8, frame, 0.2, 0, frame)
-    
-    # Draw app title
-    title = "CAPTURE SMILE AI"
-   cv2.putText(frame, title, (20, 45), cv2.FONT_HERSHEY_DUPLEX, 1.2, (255, 255, 255), 3)
-    cv2.putText(frame, title, (20, 45), cv2.FONT_HERSHEY_BOLD, 1.2, (100, 200, 255), 2)
-    
-    # Draw photo counter on the right
-    counter_text = f"Photos: {photos_captured}"
-    text_size = cv2.getTextSize(counter_text, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)[0]
-    counter_x = width - text_size[0] - 20
-    cv2.putText(frame, counter_text, (counter_x, 45), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+    # Gradient strip and title are pre-rendered sprites (see annotation_renderer)
+    _renderer.draw_header(frame, photos_captured)
 
 
 def draw_footer_bar(frame, status_text):
@@ -52,69 +46,32 @@ def draw_footer_bar(frame, status_text):
         frame: The video frame to draw on
         status_text: Current status message to display
     """
-    height, width = frame.shape[:2]
-    footer_height = 70
-    footer_y = height - footer_height
-    
-    # Create gradient background for footer
-    overlay = frame.copy()
-    for i in range(footer_height):
-        alpha = i / footer_height
-        color_val = int(60 - (20 * alpha))
-        cv2.rectangle(overlay, (0, footer_y + i), (width, footer_y + i + 1), (color_val, color_val, 40), -1)
-    
-    # Blend overlay with frame
-    cv2.addWeighted(overlay, 0.8, frame, 0.2, 0, frame)
-    
-    # Draw status text (centered)
-    status_size = cv2.getTextSize(status_text, cv2.FONT_HERSHEY_SIMPLEX, 0.9, 2)[0]
-    status_x = (width - status_size[0]) // 2
-    cv2.putText(frame, status_text, (status_x, footer_y + 30), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (100, 255, 100), 2)
-    
-    # Draw instruction text at bottom
-    instruction = "Press 'Q' to Quit  |  Smile to Capture"
-    inst_size = cv2.getTextSize(instruction, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)[0]
-    inst_x = (width - inst_size[0]) // 2
-    cv2.putText(frame, instruction, (inst_x, footer_y + 55), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
-
-
-def draw_rounded_rectangle(frame, x, y, w, h, color, thickness=2, corner_radius=15):
-    """
-    Draw a rectangle with rounded corners for better aesthetics.
-    
-    Args:
-        frame: The video frame to draw on
-        x, y, w, h: Rectangle coordinates and dimensions
-        color: Color tuple (B, G, R)
-        thickness: Line thickness
-        corner_radius: Radius of rounded corners
-    """
-    # Draw the four sides
-    cv2.line(frame, (x + corner_radius, y), (x + w - corner_radius, y), color, thickness)
-    cv2.line(frame, (x + corner_radius, y + h), (x + w - corner_radius, y + h), color, thickness)
-    cv2.line(frame, (x, y + corner_radius), (x, y + h - corner_radius), color, thickness)
-    cv2.line(frame, (x + w, y + corner_radius), (x + w, y + h - corner_radius), color, thickness)
-    
-    # Draw the four corners
-    cv2.ellipse(frame, (x + corner_radius, y + corner_radius), (corner_radius, corner_radius), 180, 0, 90, color, thickness)
-    cv2.ellipse(frame, (x + w - corner_radius, y + corner_radius), (corner_radius, corner_radius), 270, 0, 90, color, thickness)
-    cv2.ellipse(frame, (x + corner_radius, y + h - corner_radius), (corner_radius, corner_radius), 90, 0, 90, color, thickness)
-    cv2.ellipse(frame, (x + w - corner_radius, y + h - corner_radius), (corner_radius, corner_radius), 0, 0, 90, color, thickness)
+    _renderer.draw_footer(frame, status_text)
 
 
-def initialize_camera():
+def initialize_camera(profile=None):
     """
     Initialize and configure the webcam.
     Returns the camera object for video capture.
+    
+    Args:
+        profile: Optional camera profile (see camera_profile) with the
+                 resolution, FPS, FOURCC and buffer size to request
     """
-    # Create a video capture object (0 is the default camera)
-    camera = cv2.VideoCapture(0)
+    # Read from the frame bus when its daemon is running, else open the camera (0 is the default)
+    camera = open_capture(profile.get('device', 0) if profile else 0)
     
     # Check if camera opened successfully
     if not camera.isOpened():
         print("Error: Could not access the webcam!")
         return None
     
+    # Pin the measured capture mode instead of the driver defaults
+    # (the frame bus daemon applies the profile itself)
+    if profile and isinstance(camera, cv2.VideoCapture):
+        mode = apply_profile(camera, profile)
+        print(f"Camera mode: {mode['width']}x{mode['height']} @ {mode['fps']:g} fps ({mode['fourcc']})")
+    
     print("Camera initialized successfully!")
     return camera
 
@@ -139,7 +96,8 @@ def load_classifiers():
     return face_cascade, smile_cascade
 
 
-def detect_faces_and_smiles(frame, face_cascade, smile_cascade):
+def detect_faces_and_smiles(frame, face_cascade, smile_cascade, smile_detector=None, tracer=NULL_TRACER,
+                            scale=1.0, detect_smiles=True, gray=None, previous_smiles=None):
     """
     Detect faces and smiles in the given frame with beautiful visual indicators.
     
@@ -147,66 +105,76 @@ def detect_faces_and_smiles(frame, face_cascade, smile_cascade):
         frame: The video frame to analyze
         face_cascade: Haar Cascade classifier for faces
         smile_cascade: Haar Cascade classifier for smiles
+        smile_detector: Optional ParallelSmileDetector that checks all faces at once
+        tracer: FrameTracer that records timing spans (disabled by default)
+        scale: Run detection on a copy resized by this factor (boxes are
+               mapped back to full-frame coordinates)
+        detect_smiles: False skips the smile cascade for this frame (load shedding)
+                       and draws previous_smiles instead, if the face count is unchanged
+        gray: Grayscale version of the frame if already available (frame bus)
+        previous_smiles: face_smiles returned for the previous frame
     
     Returns:
         faces: List of detected face rectangles
-        smile_detected: Boolean indicating if a smile was found
+        smile_flags: One boolean per face indicating if that face is smiling
+        face_smiles: Smile rectangles for each face, to pass back as previous_smiles
     """
     # Convert frame to grayscale (Haar Cascades work better with grayscale images)
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    with tracer.span("grayscale"):
+        if gray is None:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        # High-resolution stills: detect on a smaller preview of the frame
+        if scale < 1.0:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
     
     # Detect faces in the frame
     # Parameters: scaleFactor=1.3 (how much image is reduced at each scale)
     #            minNeighbors=5 (how many neighbors each candidate rectangle should have)
-    faces = face_cascade.detectMultiScale(gray, scaleFactor=1.3, minNeighbors=5)
-    
-    smile_detected = False
-    
-    # Loop through each detected face
-    for (x, y, w, h) in faces:
-        # Draw a modern rounded rectangle around the face with glow effect
-        # Outer glow (cyan)
-        draw_rounded_rectangle(frame, x-2, y-2, w+4, h+4, (255, 200, 100), thickness=3, corner_radius=20)
-        # Inner border (bright cyan)
-        draw_rounded_rectangle(frame, x, y, w, h, (255, 255, 100), thickness=2, corner_radius=18)
-        
-        # Add "FACE DETECTED" label above the face
-        label = "FACE DETECTED"
-        label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)[0]
-        label_x = x + (w - label_size[0]) // 2
-        label_y = y - 10
-        if label_y > 20:
-            cv2.putText(frame, label, (label_x, label_y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
-            cv2.putText(frame, label, (label_x, label_y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (100, 255, 255), 1)
-        
-        # Extract the region of interest (ROI) - the face area
-        roi_gray = gray[y:y + h, x:x + w]
-        roi_color = frame[y:y + h, x:x + w]
-        
-        # Detect smiles within the face region
-        # Using stricter parameters for more accurate smile detection
-        smiles = smile_cascade.detectMultiScale(roi_gray, scaleFactor=1.8, minNeighbors=20)
-        
-        # Loop through detected smiles
-        for (sx, sy, sw, sh) in smiles:
-            # Draw a stylish rectangle around the smile with double border
-            # Outer glow (pink)
-            cv2.rectangle(roi_color, (sx-2, sy-2), (sx + sw+2, sy + sh+2), (200, 100, 255), 3)
-            # Inner border (bright pink)
-            cv2.rectangle(roi_color, (sx, sy), (sx + sw, sy + sh), (255, 150, 255), 2)
-            
-            # Add smile icon indicator
-            smile_icon = "^_^"
-            icon_size = cv2.getTextSize(smile_icon, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)[0]
-            icon_x = sx + (sw - icon_size[0]) // 2
-            icon_y = sy + sh + 20
-            if icon_y < h - 5:
-                cv2.putText(roi_color, smile_icon, (icon_x, icon_y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-                cv2.putText(roi_color, smile_icon, (icon_x, icon_y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 100, 255), 1)
-            
-            smile_detected = True
+    with tracer.span("face_cascade"):
+        faces = face_cascade.detectMultiScale(gray, scaleFactor=1.3, minNeighbors=5)
+    
+    # Detect smiles within every face region before drawing anything
+    # Using stricter parameters for more accurate smile detection
+    # A skipped frame redraws the last results, so boxes don't blink under load
+    reuse = not detect_smiles and previous_smiles is not None and len(previous_smiles) == len(faces)
+    if reuse:
+        face_smiles = previous_smiles
+    elif smile_detector is not None:
+        face_smiles = smile_detector.detect(gray, faces)
+    else:
+        face_smiles = []
+        for (x, y, w, h) in faces:
+            with tracer.span("smile_cascade"):
+                face_smiles.append(smile_cascade.detectMultiScale(gray[y:y + h, x:x + w], scaleFactor=1.8, minNeighbors=20))
+    
+    # Map the preview boxes back onto the full-size frame (reused smiles already are)
+    if scale < 1.0:
+        faces = (np.asarray(faces) / scale).astype(int)
+        if not reuse:
+            face_smiles = [(np.asarray(smiles) / scale).astype(int) for smiles in face_smiles]
+    
+    with tracer.span("face_overlay"):
+        smile_flags = draw_face_annotations(frame, faces, face_smiles)
+    
+    return faces, smile_flags, face_smiles
+
+
+def draw_face_annotations(frame, faces, face_smiles):
+    """
+    Draw the face boxes, labels and smile markers for every detected face.
+    
+    Boxes for all faces are drawn in a single batch and the labels are
+    cached sprites, so the cost barely grows with the number of faces.
+    
+    Args:
+        frame: The video frame to draw on
+        faces: List of detected face rectangles
+        face_smiles: Smile rectangles for each face (relative to the face)
     
-    return faces, smile_detected
+    Returns:
+        smile_flags: One boolean per face indicating if that face is smiling
+    """
+    return _renderer.draw_faces(frame, faces, face_smiles)
 
 
 def save_photo(frame, photo_counter):
@@ -244,53 +212,8 @@ def display_countdown(frame, countdown_value, countdown_frames):
         countdown_value: The countdown number to display (3, 2, or 1)
         countdown_frames: Current frame count for pulse animation
     """
-    if countdown_value > 0:
-        # Get frame dimensions
-        height, width = frame.shape[:2]
-        
-        # Create pulse effect (size changes based on frame count)
-        pulse = 1.0 + (0.3 * abs((countdown_frames % 20) - 10) / 10)
-        
-        # Set text properties for large countdown with pulse effect
-        font = cv2.FONT_HERSHEY_BOLD
-        font_scale = 8.0 * pulse  # Very large font with animation
-        thickness = int(15 * pulse)
-        
-        # Color changes based on countdown value
-        colors = {
-            3: (100, 255, 100),   # Green for 3
-            2: (100, 200, 255),   # Yellow for 2
-            1: (100, 100, 255)    # Red for 1
-        }
-        color = colors.get(countdown_value, (100, 255, 100))
-        
-        # Get text size to center it
-        text = str(countdown_value)
-        text_size = cv2.getTextSize(text, font, font_scale, thickness)[0]
-        text_x = (width - text_size[0]) // 2
-        text_y = (height + text_size[1]) // 2
-        
-        # Draw glowing circle background
-        circle_radius = int(150 * pulse)
-        cv2.circle(frame, (width // 2, height // 2), circle_radius + 20, (50, 50, 50), -1)
-        cv2.circle(frame, (width // 2, height // 2), circle_radius + 15, color, 5)
-        cv2.circle(frame, (width // 2, height // 2), circle_radius + 10, (255, 255, 255), 2)
-        
-        # Draw countdown with shadow and glow effect
-        # Shadow
-        cv2.putText(frame, text, (text_x + 5, text_y + 5), font, font_scale, (0, 0, 0), thickness + 8)
-        # Outer glow
-        cv2.putText(frame, text, (text_x, text_y), font, font_scale, (255, 255, 255), thickness + 4)
-        # Main number
-        cv2.putText(frame, text, (text_x, text_y), font, font_scale, color, thickness)
-        
-        # Add "Get Ready!" text below
-        ready_text = "GET READY!"
-        ready_size = cv2.getTextSize(ready_text, cv2.FONT_HERSHEY_BOLD, 1.2, 2)[0]
-        ready_x = (width - ready_size[0]) // 2
-        ready_y = text_y + 100
-        cv2.putText(frame, ready_text, (ready_x, ready_y), cv2.FONT_HERSHEY_BOLD, 1.2, (255, 255, 255), 3)
-        cv2.putText(frame, ready_text, (ready_x, ready_y), cv2.FONT_HERSHEY_BOLD, 1.2, (100, 255, 255), 2)
+    # Each digit is rasterized once per pulse size, glow and shadow included
+    _renderer.draw_countdown(frame, countdown_value, countdown_frames)
 
 
 def display_message(frame, message, duration_counter, max_duration=30):
@@ -306,60 +229,71 @@ def display_message(frame, message, duration_counter, max_duration=30):
     Returns:
         Updated duration_counter
     """
-    if duration_counter > 0:
-        # Get frame dimensions
-        height, width = frame.shape[:2]
-        
-        # Create fade-in fade-out effect
-        if duration_counter > max_duration - 10:
-            alpha = (max_duration - duration_counter) / 10
-        elif duration_counter < 10:
-            alpha = duration_counter / 10
-        else:
-            alpha = 1.0
-        
-        # Set text properties
-        font = cv2.FONT_HERSHEY_BOLD
-        font_scale = 2.0
-        thickness = 4
-        
-        # Get text size to center it
-        text_size = cv2.getTextSize(message, font, font_scale, thickness)[0]
-        text_x = (width - text_size[0]) // 2
-        text_y = 150
-        
-        # Draw background box with transparency
-        padding = 20
-        box_x1 = text_x - padding
-        box_y1 = text_y - text_size[1] - padding
-        box_x2 = text_x + text_size[0] + padding
-        box_y2 = text_y + padding
-        
-        overlay = frame.copy()
-        cv2.rectangle(overlay, (box_x1, box_y1), (box_x2, box_y2), (50, 200, 50), -1)
-        cv2.rectangle(overlay, (box_x1, box_y1), (box_x2, box_y2), (100, 255, 100), 3)
-        cv2.addWeighted(overlay, 0.7 * alpha, frame, 1 - (0.7 * alpha), 0, frame)
-        
-        # Draw checkmark icon
-        checkmark = "✓"
-        check_size = cv2.getTextSize(checkmark, font, 2.0, 4)[0]
-        check_x = text_x - check_size[0] - 30
-        cv2.putText(frame, checkmark, (check_x, text_y), font, 2.0, (100, 255, 100), 6)
-        
-        # Draw text with shadow and glow effect
-        cv2.putText(frame, message, (text_x + 2, text_y + 2), font, font_scale, (0, 0, 0), thickness + 2)
-        cv2.putText(frame, message, (text_x, text_y), font, font_scale, (255, 255, 255), thickness)
-        cv2.putText(frame, message, (text_x, text_y), font, font_scale, (100, 255, 100), thickness - 1)
-        
-        return duration_counter - 1
-    
-    return 0
+    return _renderer.draw_message(frame, message, duration_counter, max_duration)
+
+
+def parse_args(argv=None):
+    """
+    Parse the command-line options for the capture loop.
+    
+    Args:
+        argv: Argument list (defaults to sys.argv)
+    
+    Returns:
+        argparse.Namespace with the parsed options
+    """
+    parser = argparse.ArgumentParser(description="Capture Smile AI - automatic smile detection and photo capture")
+    parser.add_argument('--trigger', default='any',
+                        help="Group trigger policy: any, all, at_least:N or fraction:F (default: any)")
+    parser.add_argument('--hold-ms', type=int, default=0,
+                        help="How long the trigger condition must hold steadily, in milliseconds (default: 0)")
+    parser.add_argument('--smile-workers', type=int, default=None,
+                        help="Threads used for per-face smile detection; 0 or 1 runs sequentially (default: CPU count, max 8)")
+    parser.add_argument('--camera-profile', default=DEFAULT_PROFILE_PATH,
+                        help="Camera profile from 'camera_test.py --probe' (default: camera_profile.json, if present)")
+    parser.add_argument('--dedupe-threshold', type=int, default=10,
+                        help="Skip captures within this Hamming distance of a recent photo; 0 disables (default: 10)")
+    parser.add_argument('--clips', action='store_true',
+                        help="Also save a short video clip around every captured photo")
+    parser.add_argument('--clip-pre', type=float, default=3.0,
+                        help="Seconds of video before the capture (default: 3)")
+    parser.add_argument('--clip-post', type=float, default=2.0,
+                        help="Seconds of video after the capture (default: 2)")
+    parser.add_argument('--clip-width', type=int, default=960,
+                        help="Width of buffered clip frames; 0 keeps full size (default: 960)")
+    parser.add_argument('--target-fps', type=float, default=30,
+                        help="Frame rate the load shedder tries to hold; 0 disables it (default: 30)")
+    parser.add_argument('--trace', metavar='PATH', default=None,
+                        help="Record a Chrome/Perfetto frame timeline and write it to PATH on exit ('t' dumps it live)")
+    parser.add_argument('--trace-capacity', type=int, default=65536,
+                        help="Number of spans kept in the trace ring buffer (default: 65536)")
+    parser.add_argument('--event-log', metavar='FOLDER', default='event_logs',
+                        help="Folder for the binary per-frame event log; '' disables it (default: event_logs)")
+    parser.add_argument('--event-log-mb', type=float, default=DEFAULT_MAX_BYTES / (1024 * 1024),
+                        help="Start a new event log file at this size in MB (default: 64)")
+    return parser.parse_args(argv)
 
 
-def main():
+def main(args=None):
     """
     Main function to run the Capture Smile AI application.
+    
+    Args:
+        args: Parsed command-line options (see parse_args)
     """
+    if args is None:
+        args = parse_args([])
+    
+    try:
+        trigger_policy = TriggerPolicy.from_string(args.trigger, hold_ms=args.hold_ms)
+    except ValueError as e:
+        print(f"Error: Invalid trigger policy - {e}")
+        return
+    
+    if not 0 <= args.dedupe_threshold < HASH_BITS:
+        print(f"Error: --dedupe-threshold must be between 0 and {HASH_BITS - 1}")
+        return
+    
     print("=" * 60)
     print("      Welcome to Capture Smile AI!")
     print("=" * 60)
@@ -369,116 +303,237 @@ def main():
     print("- A 3-2-1 countdown will appear before capturing")
     print("- Press 'q' to quit the application")
     print("- Photos will be saved in the 'captured_smiles' folder")
+    print(f"- Countdown starts when {trigger_policy.describe()} smile")
     print("=" * 60)
     print()
     
-    # Initialize the camera
-    camera = initialize_camera()
+    # Initialize the camera with the probed profile, if there is one
+    camera_profile = load_profile(args.camera_profile)
+    camera = initialize_camera(camera_profile)
     if camera is None:
         return
     
+    # Detection runs on a preview of this scale when stills are captured large
+    scale = detection_scale(camera_profile, int(camera.get(cv2.CAP_PROP_FRAME_WIDTH)))
+    if scale < 1.0:
+        print(f"Detecting on a {scale:.2f}x preview, saving full-resolution stills")
+    
     # Load Haar Cascade classifiers
     face_cascade, smile_cascade = load_classifiers()
     if face_cascade is None or smile_cascade is None:
         camera.release()
         return
     
+    # Optional frame timeline; the null tracer costs nothing when disabled
+    if args.trace:
+        tracer = FrameTracer(capacity=args.trace_capacity, path=args.trace)
+        tracer.dump_on_exit()
+        print(f"Tracing enabled - timeline will be saved to {args.trace}")
+    else:
+        tracer = NULL_TRACER
+    
+    # Wrap the overlay and disk functions so each call shows up as a span
+    save = tracer.wrap(save_photo, "disk_write")
+    countdown_overlay = tracer.wrap(display_countdown)
+    message_overlay = tracer.wrap(display_message)
+    header_overlay = tracer.wrap(draw_header_bar)
+    footer_overlay = tracer.wrap(draw_footer_bar)
+    
+    # Thread pool that runs the smile cascade on all faces in parallel
+    smile_detector = ParallelSmileDetector(max_workers=args.smile_workers, tracer=tracer)
+    
+    # Steps detection size, smile frequency and effects down when frames run long
+    # Levels past 5 only lower stream JPEG quality, which this loop never encodes
+    shedder = LoadShedder(target_fps=args.target_fps or 30, max_level=5, enabled=args.target_fps > 0)
+    
+    # Rolling buffer of compressed frames for pre/post-roll clips
+    clip_recorder = None
+    if args.clips:
+        camera_fps = camera.get(cv2.CAP_PROP_FPS) or 30
+        clip_recorder = ClipRecorder(args.clip_pre, args.clip_post, fps=camera_fps,
+                                     max_width=args.clip_width or None)
+    
+    # One fixed-size record per frame for later analytics (see event_log.py)
+    event_log = None
+    if args.event_log:
+        event_log = EventLog(args.event_log, max_bytes=int(args.event_log_mb * 1024 * 1024))
+        print(f"Logging frame events to {event_log.path}")
+    
+    # Perceptual hashes of recent captures, used to skip near-identical poses
+    recent_captures = RecentCaptureIndex(threshold=args.dedupe_threshold) if args.dedupe_threshold > 0 else None
+    
     # Initialize counters
     photo_counter = 1
     message_duration = 0
+    message_text = "Photo Captured!"
+    faces = ()  # Faces found in the previous frame
+    smile_flags = []  # Smile results from the previous frame
+    face_smiles = None  # Smile boxes from the previous frame, redrawn when the cascade is skipped
     smile_cooldown = 0  # Cooldown to prevent multiple captures of the same smile
     countdown_timer = 0  # Countdown value (3, 2, 1, or 0 when not counting)
     countdown_frames = 0  # Frame counter for countdown timing
     capture_next_frame = False  # Flag to capture photo on next frame (after countdown)
+    frame_seq = 0  # Sequence number used to tag trace spans
     
     print("Starting live camera feed... Press 'q' to quit.\n")
     
     # Main loop - continuously capture and process frames
-    while True:
-        # Read a frame from the camera
-        success, frame = camera.read()
-        
-        # Check if frame was read successfully
-        if not success:
-            print("Error: Failed to read frame from camera!")
-            break
-        
-        # If we need to capture a photo this frame (after countdown completed)
-        if capture_next_frame:
-            # Capture the photo (frame is clean, no countdown overlay)
-            photo_counter = save_photo(frame, photo_counter)
+    # Cleanup runs in finally so a crash or Ctrl+C still trims the event log and writes pending clips
+    try:
+        while True:
+            frame_seq += 1
+            tracer.begin_frame(frame_seq)
+            
+            # Read a frame from the camera
+            with tracer.span("capture"):
+                success, frame = camera.read()
             
-            # Set message display duration (30 frames ≈ 1 second at 30fps)
-            message_duration = 30
+            # Check if frame was read successfully
+            if not success:
+                print("Error: Failed to read frame from camera!")
+                break
             
-            # Set cooldown to prevent multiple captures (90 frames ≈ 3 seconds)
-            smile_cooldown = 90
+            # Processing time (not the wait for the camera) drives the load shedder
+            shedder.frame_start()
+            processing_started = time.perf_counter()
+            frame_state = STATE_IDLE
             
-            # Reset the capture flag
-            capture_next_frame = False
-        
-        # Detect faces and smiles in the current frame
-        faces, smile_detected = detect_faces_and_smiles(frame, face_cascade, smile_cascade)
-        
-        # If a smile is detected and cooldown has expired and no countdown is active
-        if smile_detected and smile_cooldown == 0 and countdown_timer == 0:
-            # Start the countdown at 3
-            countdown_timer = 3
-            countdown_frames = 0
-            print("Smile detected! Starting countdown...")
-        
-        # Handle countdown logic
-        if countdown_timer > 0:
-            # Display the current countdown number with animation
-            display_countdown(frame, countdown_timer, countdown_frames)
+            # Buffer the clean frame before any overlay is drawn on it
+            if clip_recorder is not None:
+                clip_recorder.push(frame)
+            load = shedder.settings
+            _renderer.effects = load['effects']
             
-            # Increment frame counter
-            countdown_frames += 1
+            # If we need to capture a photo this frame (after countdown completed)
+            if capture_next_frame:
+                # Hash the faces (from the last countdown frame) and compare with recent photos
+                duplicate = None
+                if recent_captures is not None:
+                    photo_hash = capture_hash(frame, faces)
+                    duplicate = recent_captures.find(photo_hash)
+                
+                if duplicate is not None:
+                    # Same pose as a photo we already have - don't save it again
+                    print(f"Skipped near-duplicate of {duplicate[1]} (distance {duplicate[0]})")
+                    message_text = "Already Captured!"
+                    frame_state = STATE_DUPLICATE
+                else:
+                    # Capture the photo (frame is clean, no countdown overlay)
+                    if recent_captures is not None:
+                        recent_captures.add(photo_hash, f"smile_{photo_counter}.jpg")
+                    if clip_recorder is not None:
+                        clip_recorder.trigger(f"smile_{photo_counter}")
+                    photo_counter = save(frame, photo_counter)
+                    message_text = "Photo Captured!"
+                    frame_state = STATE_CAPTURED
+                
+                # Set message display duration (30 frames ≈ 1 second at 30fps)
+                message_duration = 30
+                
+                # Set cooldown to prevent multiple captures (90 frames ≈ 3 seconds)
+                smile_cooldown = 90
+                
+                # Reset the capture flag
+                capture_next_frame = False
             
-            # Change countdown number every 30 frames (≈ 1 second at 30fps)
-            if countdown_frames >= 30:
-                countdown_timer -= 1
+            # Detect faces and smiles in the current frame
+            # Under load the smile cascade only runs every few frames (or when the faces change)
+            run_smiles = frame_seq % load['smile_every'] == 0
+            faces, smile_flags, face_smiles = detect_faces_and_smiles(
+                frame, face_cascade, smile_cascade, smile_detector, tracer, scale * load['detect_scale'],
+                run_smiles, getattr(camera, 'last_gray', None), face_smiles)
+            smile_detected = any(smile_flags)
+            
+            # Let the trigger policy decide whether enough faces are smiling steadily
+            group_ready = trigger_policy.update(smile_flags)
+            
+            # If the group is smiling and cooldown has expired and no countdown is active
+            if group_ready and smile_cooldown == 0 and countdown_timer == 0:
+                # Start the countdown at 3
+                countdown_timer = 3
                 countdown_frames = 0
+                trigger_policy.reset()
+                print("Smile detected! Starting countdown...")
+            
+            if frame_state == STATE_IDLE:
+                if countdown_timer > 0:
+                    frame_state = STATE_COUNTDOWN
+                elif group_ready:
+                    frame_state = STATE_READY
+            
+            # Handle countdown logic
+            if countdown_timer > 0:
+                # Display the current countdown number with animation
+                countdown_overlay(frame, countdown_timer, countdown_frames)
                 
-                # If countdown finished, set flag to capture on NEXT frame
-                if countdown_timer == 0:
-                    capture_next_frame = True
-        
-        # Decrease cooldown counter
-        if smile_cooldown > 0:
-            smile_cooldown -= 1
-        
-        # Display "Photo Captured!" message if active (only when not counting down)
-        if countdown_timer == 0:
-            message_duration = display_message(frame, "Photo Captured!", message_duration)
-        
-        # Determine current status for footer
-        if countdown_timer > 0:
-            status_text = f"📸 COUNTDOWN: {countdown_timer}"
-        elif len(faces) > 0:
-            if smile_detected:
-                status_text = "😊 SMILE DETECTED - Keep Smiling!"
+                # Increment frame counter
+                countdown_frames += 1
+                
+                # Change countdown number every 30 frames (≈ 1 second at 30fps)
+                if countdown_frames >= 30:
+                    countdown_timer -= 1
+                    countdown_frames = 0
+                    
+                    # If countdown finished, set flag to capture on NEXT frame
+                    if countdown_timer == 0:
+                        capture_next_frame = True
+            
+            # Decrease cooldown counter
+            if smile_cooldown > 0:
+                smile_cooldown -= 1
+            
+            # Display "Photo Captured!" (or "Already Captured!") message if active (only when not counting down)
+            if countdown_timer == 0:
+                message_duration = message_overlay(frame, message_text, message_duration)
+            
+            # Determine current status for footer
+            if countdown_timer > 0:
+                status_text = f"📸 COUNTDOWN: {countdown_timer}"
+            elif len(faces) > 0:
+                if smile_detected:
+                    status_text = "😊 SMILE DETECTED - Keep Smiling!"
+                else:
+                    status_text = "😐 Face Detected - SMILE to Capture!"
             else:
-                status_text = "😐 Face Detected - SMILE to Capture!"
-        else:
-            status_text = "👤 Looking for Faces..."
-        
-        # Draw the beautiful UI elements
-        draw_header_bar(frame, photo_counter - 1)
-        draw_footer_bar(frame, status_text)
-        
-        # Display the frame in a window with custom name
-        cv2.imshow('Capture Smile AI - Professional Edition', frame)
-        
-        # Wait for 1ms and check if 'q' key is pressed
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            print("\nQuitting application...")
-            break
-    
-    # Clean up resources
-    print("Releasing camera and closing windows...")
-    camera.release()
-    cv2.destroyAllWindows()
+                status_text = "👤 Looking for Faces..."
+            if shedder.level > 0:
+                status_text += f"  |  LOAD {shedder.level}"
+            
+            # Draw the beautiful UI elements
+            header_overlay(frame, photo_counter - 1)
+            footer_overlay(frame, status_text)
+            
+            # Display the frame in a window with custom name
+            with tracer.span("display"):
+                cv2.imshow('Capture Smile AI - Professional Edition', frame)
+                
+                # Wait for 1ms and check which key is pressed
+                key = cv2.waitKey(1) & 0xFF
+            
+            if event_log is not None:
+                event_log.append(frame_seq, len(faces), sum(smile_flags), frame_state,
+                                 (time.perf_counter() - processing_started) * 1000.0, shedder.level)
+            
+            if shedder.frame_end():
+                print(f"Load shedding: {shedder.describe()}")
+            
+            if key == ord('q'):
+                print("\nQuitting application...")
+                break
+            elif key == ord('t'):
+                # Dump the trace ring without stopping
+                tracer.dump()
+    finally:
+        # Clean up resources
+        print("Releasing camera and closing windows...")
+        camera.release()
+        smile_detector.close()
+        if clip_recorder is not None:
+            # Writes any clip still waiting for its post-roll
+            clip_recorder.close()
+        if event_log is not None:
+            event_log.close()
+        cv2.destroyAllWindows()
     
     print(f"\nTotal photos captured: {photo_counter - 1}")
     print("Thank you for using Capture Smile AI!")
@@ -486,4 +541,4 @@ def main():
 
 # Entry point of the program
 if __name__ == "__main__":
-    main()
+    main(parse_args())
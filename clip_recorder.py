@@ -0,0 +1,166 @@
+"""
+Clip Recorder - Pre/post-roll video clips of each smile moment
+
+Recent frames are kept in a rolling in-memory buffer, JPEG-compressed on a
+background thread (and optionally downscaled), so a few seconds of 1080p
+history costs megabytes rather than gigabytes. When a photo is taken the
+buffered pre-roll and the following post-roll are handed to a second
+thread that decodes them and writes an MP4 (or AVI) with cv2.VideoWriter.
+The live loop only hands over a copy of each frame and never waits.
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import cv2
+
+
+class ClipRecorder:
+    """
+    Keep a compressed frame ring and write clips around trigger moments.
+
+    Args:
+        pre_seconds: Seconds of video kept before the trigger
+        post_seconds: Seconds of video recorded after the trigger
+        fps: Expected camera frame rate (sizes the ring)
+        max_width: Downscale buffered frames to this width (None keeps full size)
+        jpeg_quality: Quality used for the in-memory frames
+        folder: Where clips are written
+    """
+
+    def __init__(self, pre_seconds=3.0, post_seconds=2.0, fps=30, max_width=960, jpeg_quality=80,
+                 folder='captured_smiles/clips'):
+        self.pre_frames = max(1, int(pre_seconds * fps))
+        self.post_frames = max(1, int(post_seconds * fps))
+        self.max_width = max_width
+        self.jpeg_quality = jpeg_quality
+        self.folder = folder
+        self.dropped = 0
+
+        self._ring = deque(maxlen=self.pre_frames)  # (timestamp, jpeg bytes)
+        self._recording = []  # Clips still collecting post-roll: [name, frames, remaining]
+        self._triggers = deque()  # (timestamp, name) waiting for the encoder
+        self._frames = queue.Queue(maxsize=8)
+        self._clips = queue.Queue()
+        self._encoder = threading.Thread(target=self._encode_loop, name='clip-encoder', daemon=True)
+        self._writer = threading.Thread(target=self._write_loop, name='clip-writer', daemon=True)
+        self._encoder.start()
+        self._writer.start()
+
+    def push(self, frame):
+        """
+        Offer a clean frame to the buffer. Never blocks the caller.
+
+        The frame is copied (or downscaled into a new array) first, because
+        the live loop goes on to draw overlays on it.
+        """
+        height, width = frame.shape[:2]
+        if self.max_width and width > self.max_width:
+            scale = self.max_width / width
+            frame = cv2.resize(frame, (self.max_width, int(height * scale)), interpolation=cv2.INTER_AREA)
+        else:
+            frame = frame.copy()
+
+        try:
+            self._frames.put_nowait((time.monotonic(), frame))
+        except queue.Full:
+            # Encoder is behind - drop this frame rather than stall the live loop
+            self.dropped += 1
+
+    def trigger(self, name):
+        """
+        Start a clip: the current pre-roll plus the next post-roll frames.
+
+        Args:
+            name: File name without extension (e.g. "smile_3")
+        """
+        self._triggers.append((time.monotonic(), name))
+
+    def _encode_loop(self):
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]
+        while True:
+            item = self._frames.get()
+            if item is None:
+                break
+
+            timestamp, frame = item
+
+            # Frames from before the trigger are pre-roll, so snapshot the ring here
+            while self._triggers and self._triggers[0][0] <= timestamp:
+                _, name = self._triggers.popleft()
+                self._recording.append([name, list(self._ring), self.post_frames])
+
+            ok, buffer = cv2.imencode('.jpg', frame, params)
+            if not ok:
+                continue
+            entry = (timestamp, buffer)
+            self._ring.append(entry)
+
+            for clip in self._recording:
+                clip[1].append(entry)
+                clip[2] -= 1
+            finished = [clip for clip in self._recording if clip[2] <= 0]
+            for clip in finished:
+                self._recording.remove(clip)
+                self._clips.put((clip[0], clip[1]))
+
+        # Flush clips that were still waiting for post-roll
+        while self._triggers:
+            _, name = self._triggers.popleft()
+            self._recording.append([name, list(self._ring), 0])
+        for name, frames, _ in self._recording:
+            self._clips.put((name, frames))
+        self._recording = []
+        self._clips.put(None)
+
+    def _write_loop(self):
+        while True:
+            item = self._clips.get()
+            if item is None:
+                break
+            name, frames = item
+            try:
+                self._write_clip(name, frames)
+            except cv2.error as e:
+                print(f"Error: Could not write clip {name} - {e}")
+
+    def _write_clip(self, name, frames):
+        if len(frames) < 2:
+            return
+
+        first = cv2.imdecode(frames[0][1], cv2.IMREAD_COLOR)
+        height, width = first.shape[:2]
+
+        # Play back at the rate the frames actually arrived
+        duration = frames[-1][0] - frames[0][0]
+        fps = (len(frames) - 1) / duration if duration > 0 else 30.0
+
+        os.makedirs(self.folder, exist_ok=True)
+        path = os.path.join(self.folder, f"{name}.mp4")
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+        if not writer.isOpened():
+            # Builds without an MP4 muxer can still write Motion-JPEG AVI
+            path = os.path.join(self.folder, f"{name}.avi")
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (width, height))
+            if not writer.isOpened():
+                print(f"Error: Could not open a video writer for {name}")
+                return
+
+        writer.write(first)
+        for _, buffer in frames[1:]:
+            writer.write(cv2.imdecode(buffer, cv2.IMREAD_COLOR))
+        writer.release()
+        print(f"Clip saved: {path} ({len(frames)} frames, {len(frames) / fps:.1f}s)")
+
+    def memory_bytes(self):
+        """Approximate size of the buffered pre-roll."""
+        return sum(buffer.nbytes for _, buffer in list(self._ring))
+
+    def close(self):
+        """Finish any clip in progress and stop the threads."""
+        self._frames.put(None)
+        self._encoder.join()
+        self._writer.join()
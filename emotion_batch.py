@@ -0,0 +1,283 @@
+"""
+Emotion Batch - Label every captured photo with per-face emotions
+
+Faces are found with the same Haar cascade as the live EmotionDetector and
+each face is classified with DeepFace in a pool of worker processes. Every
+worker loads the emotion model once when it starts instead of once per
+photo.
+
+Results live in a SQLite cache keyed by the image content hash plus the face
+box, so a rerun only analyzes photos that are new or have changed. Renamed
+or copied photos are recognised by their hash. Results can also be written
+out as JSON Lines, one face per line.
+
+Usage:
+    python emotion_batch.py
+    python emotion_batch.py --src captured_smiles --jsonl emotions.jsonl --workers 4
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import cv2
+
+from export_photos import IMAGE_EXTENSIONS, file_hash
+
+
+DEFAULT_CACHE_NAME = '.emotions.sqlite'
+MODEL_NAME = 'Emotion'
+DEFAULT_WORKERS = 2  # Each worker holds TensorFlow plus the model, about 1 GB
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS photos (
+    path TEXT PRIMARY KEY,
+    sha1 TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS images (
+    sha1 TEXT PRIMARY KEY,
+    width INTEGER,
+    height INTEGER,
+    faces INTEGER NOT NULL,
+    analyzed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS emotions (
+    sha1 TEXT NOT NULL,
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    w INTEGER NOT NULL,
+    h INTEGER NOT NULL,
+    model TEXT NOT NULL,
+    dominant TEXT,
+    scores TEXT,
+    PRIMARY KEY (sha1, x, y, w, h, model)
+);
+"""
+
+# Per-process state set up by _init_worker
+_face_cascade = None
+_deepface = None
+
+
+def _init_worker():
+    """Load the face cascade and the emotion model once per worker process."""
+    global _face_cascade, _deepface
+    # One OpenCV thread per worker - parallelism comes from the process pool
+    cv2.setNumThreads(1)
+    # Same for TensorFlow, which otherwise starts thread pools sized to every core
+    os.environ['TF_NUM_INTRAOP_THREADS'] = '1'
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(1)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+    _face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+
+    from deepface import DeepFace
+    # DeepFace keeps built models in a per-process cache, so analyze() reuses this one
+    try:
+        DeepFace.build_model(task='facial_attribute', model_name=MODEL_NAME)
+    except TypeError:
+        DeepFace.build_model(MODEL_NAME)  # Releases before the task argument
+    _deepface = DeepFace
+
+
+def classify_face(face):
+    """
+    Classify one cropped face.
+
+    Returns:
+        (dominant emotion, {emotion: score})
+    """
+    analysis = _deepface.analyze(face, actions=['emotion'], enforce_detection=False,
+                                 detector_backend='skip', silent=True)
+    result = analysis[0] if isinstance(analysis, list) else analysis
+    scores = {emotion: round(float(score), 3) for emotion, score in result['emotion'].items()}
+    return result['dominant_emotion'], scores
+
+
+def analyze_photo(path, known_boxes):
+    """
+    Detect faces in a photo and classify the ones not cached yet.
+
+    Args:
+        path: Image file
+        known_boxes: Face boxes of this image already in the cache
+
+    Returns:
+        (path, width, height, boxes, new results, error) - each result is
+        ((x, y, w, h), dominant, scores)
+    """
+    try:
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is None:
+            return path, None, None, [], [], 'unreadable image'
+
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        boxes = [tuple(int(v) for v in box) for box in _face_cascade.detectMultiScale(gray, 1.3, 5)]
+
+        results = []
+        for (x, y, w, h) in boxes:
+            if (x, y, w, h) in known_boxes:
+                continue
+            dominant, scores = classify_face(image[y:y + h, x:x + w])
+            results.append(((x, y, w, h), dominant, scores))
+        height, width = image.shape[:2]
+        return path, width, height, boxes, results, None
+    except Exception as e:
+        return path, None, None, [], [], str(e)
+
+
+def open_cache(path):
+    """Open (and create if needed) the SQLite result cache."""
+    db = sqlite3.connect(path)
+    db.executescript(SCHEMA)
+    return db
+
+
+def iter_jobs(src_dir, db):
+    """
+    Yield (path, sha1, known_boxes) for photos that still need analysis.
+
+    Unchanged files (same size and mtime) are skipped without reading them;
+    everything else is hashed, so renamed or copied photos hit the cache.
+    """
+    for name in sorted(os.listdir(src_dir)):
+        if not name.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        path = os.path.join(src_dir, name)
+        stat = os.stat(path)
+
+        row = db.execute("SELECT sha1, mtime, size FROM photos WHERE path = ?", (path,)).fetchone()
+        if row and row[1] == stat.st_mtime and row[2] == stat.st_size:
+            sha1 = row[0]
+        else:
+            sha1 = file_hash(path)
+            db.execute("INSERT OR REPLACE INTO photos VALUES (?, ?, ?, ?)", (path, sha1, stat.st_mtime, stat.st_size))
+
+        if db.execute("SELECT 1 FROM images WHERE sha1 = ?", (sha1,)).fetchone():
+            continue
+
+        known = db.execute("SELECT x, y, w, h FROM emotions WHERE sha1 = ? AND model = ?", (sha1, MODEL_NAME))
+        yield path, sha1, {tuple(box) for box in known}
+
+
+def store_result(db, sha1, width, height, boxes, results):
+    """Record one analyzed photo in the cache."""
+    db.executemany(
+        "INSERT OR REPLACE INTO emotions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [(sha1, *box, MODEL_NAME, dominant, json.dumps(scores)) for box, dominant, scores in results])
+    db.execute("INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?)",
+               (sha1, width, height, len(boxes), time.time()))
+
+
+def export_jsonl(db, src_dir, out_path):
+    """
+    Write one JSON line per face for every photo currently in src_dir.
+
+    Returns:
+        Number of lines written
+    """
+    rows = db.execute(
+        "SELECT p.path, e.sha1, e.x, e.y, e.w, e.h, e.dominant, e.scores "
+        "FROM photos p JOIN emotions e ON e.sha1 = p.sha1 AND e.model = ? ORDER BY p.path",
+        (MODEL_NAME,))
+    count = 0
+    with open(out_path, 'w') as f:
+        for path, sha1, x, y, w, h, dominant, scores in rows:
+            if not os.path.exists(path) or os.path.dirname(path) != os.path.normpath(src_dir):
+                continue
+            f.write(json.dumps({
+                'file': os.path.basename(path),
+                'sha1': sha1,
+                'box': [x, y, w, h],
+                'emotion': dominant,
+                'scores': json.loads(scores),
+            }) + '\n')
+            count += 1
+    print(f"Wrote {count} face results to {out_path}")
+    return count
+
+
+def analyze_folder(src_dir, cache_path=None, workers=None, jsonl_path=None, commit_every=50):
+    """
+    Analyze every photo in a folder that is not in the cache yet.
+
+    Args:
+        src_dir: Folder with captured photos
+        cache_path: SQLite cache file (defaults to a hidden file in src_dir)
+        workers: Number of worker processes (default: 2)
+        jsonl_path: Optional JSON Lines file to write all results to
+        commit_every: Photos between cache commits (an interrupted run keeps its progress)
+
+    Returns:
+        (analyzed, failed) counts
+    """
+    db = open_cache(cache_path or os.path.join(src_dir, DEFAULT_CACHE_NAME))
+    src_dir = os.path.normpath(src_dir)
+    workers = workers or DEFAULT_WORKERS
+    max_pending = workers * 2  # Bounded queue keeps memory flat for huge folders
+    analyzed = failed = faces = 0
+    hashes = {}
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        pending = set()
+
+        def collect(done):
+            nonlocal analyzed, failed, faces
+            for future in done:
+                path, width, height, boxes, results, error = future.result()
+                sha1 = hashes.pop(path)
+                if error:
+                    failed += 1
+                    print(f"Failed: {path} ({error})")
+                    continue
+                store_result(db, sha1, width, height, boxes, results)
+                analyzed += 1
+                faces += len(results)
+                if analyzed % commit_every == 0:
+                    db.commit()
+                    print(f"Analyzed {analyzed} photos...")
+
+        for path, sha1, known_boxes in iter_jobs(src_dir, db):
+            hashes[path] = sha1
+            pending.add(pool.submit(analyze_photo, path, known_boxes))
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+
+        done, _ = wait(pending)
+        collect(done)
+
+    db.commit()
+    elapsed = time.perf_counter() - started
+    print(f"Analyzed {analyzed} photos, {faces} new faces ({failed} failed) in {elapsed:.1f}s")
+
+    if jsonl_path:
+        export_jsonl(db, src_dir, jsonl_path)
+    db.close()
+    return analyzed, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch emotion analysis of captured photos")
+    parser.add_argument('--src', default='captured_smiles', help="Folder with captured photos")
+    parser.add_argument('--cache', default=None, help=f"SQLite cache file (default: <src>/{DEFAULT_CACHE_NAME})")
+    parser.add_argument('--workers', type=int, default=None, help=f"Worker processes, about 1 GB each (default: {DEFAULT_WORKERS})")
+    parser.add_argument('--jsonl', default=None, help="Also write all results as JSON Lines to this file")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.src):
+        print(f"Error: Folder not found: {args.src}")
+        return
+
+    analyze_folder(args.src, args.cache, args.workers, args.jsonl)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,14 @@ import time
 import os
 from deepface import DeepFace
 
+from frame_bus import open_capture
+
 # Install: pip install deepface
 
 class EmotionDetector:
     def __init__(self):
         self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-        self.cap = cv2.VideoCapture(0)
+        self.cap = open_capture(0)
         self.emotion_colors = {
             'happy': (0, 255, 0),      # Green
             'sad': (255, 0, 0),        # Blue
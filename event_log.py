@@ -0,0 +1,254 @@
+"""
+Event Log - Fixed-record binary log of every processed frame
+
+Each frame's summary (time, face and smile counts, trigger state, load
+level, processing latency) is one 32-byte record of a NumPy structured
+dtype. Records are appended to a memory-mapped file, so logging a frame is
+a single assignment into the map:
+
+    [64-byte header: magic, version, record size, record count, created][records...]
+
+The record count in the header is written after each record, so a reader
+(even one opened while the booth is still running) never sees a partial
+row. Files roll over when they reach a size limit and are named by their
+start time, e.g. event_logs/events_20261019_093000.smlog.
+
+Analytics open a file as a zero-copy array and aggregate with NumPy:
+
+    python event_log.py event_logs --day 2026-10-19
+"""
+
+import argparse
+import glob
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+
+MAGIC = b'SMLOG\x00\x00\x01'
+VERSION = 1
+HEADER_SIZE = 64
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024  # About two million frames per file
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('version', '<u4'),
+    ('record_size', '<u4'),
+    ('count', '<u8'),
+    ('created', '<f8'),
+    ('reserved', 'u1', (32,)),
+])
+
+RECORD_DTYPE = np.dtype([
+    ('timestamp', '<f8'),   # time.time() when the frame was processed
+    ('frame', '<u8'),       # Frame sequence number
+    ('latency_ms', '<f4'),  # Processing time, excluding the wait for the camera
+    ('faces', '<u2'),
+    ('smiles', '<u2'),
+    ('state', 'u1'),        # One of the STATE_* values
+    ('load_level', 'u1'),   # Load-shedding level
+    ('reserved', 'u1', (6,)),
+])
+
+STATE_IDLE = 0
+STATE_READY = 1       # Trigger policy satisfied
+STATE_COUNTDOWN = 2
+STATE_CAPTURED = 3
+STATE_DUPLICATE = 4   # Capture skipped as a near-duplicate
+STATE_NAMES = ['idle', 'ready', 'countdown', 'captured', 'duplicate']
+
+
+class EventLog:
+    """
+    Append-only writer for frame records.
+
+    Args:
+        folder: Where log files are written
+        max_bytes: Roll over to a new file at this size
+        prefix: File name prefix
+        flush_every: Records between flushes of the map to disk
+    """
+
+    def __init__(self, folder='event_logs', max_bytes=DEFAULT_MAX_BYTES, prefix='events', flush_every=300):
+        self.folder = folder
+        self.prefix = prefix
+        self.capacity = max(1, (max_bytes - HEADER_SIZE) // RECORD_DTYPE.itemsize)
+        self.flush_every = flush_every
+        self.path = None
+        self._map = None
+        self._open_file()
+
+    def _open_file(self):
+        os.makedirs(self.folder, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        path = os.path.join(self.folder, f"{self.prefix}_{stamp}.smlog")
+        suffix = 1
+        while os.path.exists(path):
+            path = os.path.join(self.folder, f"{self.prefix}_{stamp}_{suffix}.smlog")
+            suffix += 1
+
+        # The file is sized for the full capacity up front and trimmed on close
+        self._map = np.memmap(path, dtype=np.uint8, mode='w+',
+                              shape=(HEADER_SIZE + self.capacity * RECORD_DTYPE.itemsize,))
+        self._header = self._map[:HEADER_SIZE].view(HEADER_DTYPE)
+        self._header[0] = (MAGIC, VERSION, RECORD_DTYPE.itemsize, 0, time.time(), np.zeros(32, np.uint8))
+        self._records = self._map[HEADER_SIZE:].view(RECORD_DTYPE)
+        self.path = path
+        self.count = 0
+
+    def append(self, frame, faces, smiles, state, latency_ms, load_level=0, timestamp=None):
+        """Write one frame record."""
+        if self.count >= self.capacity:
+            self._close_file()
+            self._open_file()
+
+        self._records[self.count] = (time.time() if timestamp is None else timestamp, frame, latency_ms,
+                                     faces, smiles, state, load_level, 0)
+        self.count += 1
+        # Publish the record only once it is complete
+        self._header['count'] = self.count
+
+        if self.count % self.flush_every == 0:
+            self._map.flush()
+
+    def _close_file(self):
+        self._map.flush()
+        del self._header, self._records, self._map
+        # Drop the unused preallocated tail
+        os.truncate(self.path, HEADER_SIZE + self.count * RECORD_DTYPE.itemsize)
+
+    def close(self):
+        """Flush and trim the current file."""
+        if self.path is not None:
+            self._close_file()
+            self.path = None
+
+
+def read_log(path):
+    """
+    Open a log file as a read-only, zero-copy record array.
+
+    Returns:
+        Structured array of the records written so far
+    """
+    header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+    if not len(header) or header['magic'][0] != MAGIC:
+        raise ValueError(f"{path} is not an event log")
+    if header['record_size'][0] != RECORD_DTYPE.itemsize:
+        raise ValueError(f"{path} has {header['record_size'][0]}-byte records, expected {RECORD_DTYPE.itemsize}")
+
+    count = int(header['count'][0])
+    if count == 0:
+        return np.empty(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE, shape=(count,))
+
+
+def day_files(folder, day, prefix='events'):
+    """
+    Log files started on a given day ('YYYY-MM-DD'), oldest first.
+
+    Files are ordered by the creation time in their header - names only have
+    one-second resolution, and a collision suffix (_10 before _2) does not
+    sort by name.
+    """
+    paths = glob.glob(os.path.join(folder, f"{prefix}_{day.replace('-', '')}_*.smlog"))
+    return sorted(paths, key=_created)
+
+
+def _created(path):
+    header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+    return float(header['created'][0]) if len(header) else 0.0
+
+
+def read_day(folder, day, prefix='events'):
+    """
+    All records of a day.
+
+    A day that fits in one file is returned as its zero-copy view; several
+    files are concatenated into one array.
+    """
+    parts = [read_log(path) for path in day_files(folder, day, prefix)]
+    if not parts:
+        return np.empty(0, dtype=RECORD_DTYPE)
+    return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+
+def per_minute(records, field='smiles'):
+    """
+    Sum a field per wall-clock minute.
+
+    Returns:
+        (minute start timestamps, sums)
+    """
+    if not len(records):
+        return np.empty(0), np.empty(0)
+    minutes = (records['timestamp'] // 60).astype(np.int64)
+    first = minutes.min()
+    sums = np.bincount(minutes - first, weights=records[field])
+    present = np.nonzero(np.bincount(minutes - first))[0]
+    return (present + first) * 60.0, sums[present]
+
+
+def captures_per_minute(records):
+    """Photos taken per minute: (minute start timestamps, counts)."""
+    captured = records[records['state'] == STATE_CAPTURED]
+    minutes, counts = np.unique((captured['timestamp'] // 60).astype(np.int64), return_counts=True)
+    return minutes * 60.0, counts
+
+
+def latency_percentiles(records, percentiles=(50, 95, 99)):
+    """Processing latency percentiles in milliseconds."""
+    if not len(records):
+        return {p: None for p in percentiles}
+    values = np.percentile(records['latency_ms'], percentiles)
+    return {p: round(float(v), 2) for p, v in zip(percentiles, values)}
+
+
+def summarize(records):
+    """Print an overview of a set of records."""
+    if not len(records):
+        print("No records")
+        return
+
+    start, end = records['timestamp'][0], records['timestamp'][-1]
+    span = end - start
+    states = np.bincount(records['state'], minlength=len(STATE_NAMES))
+    print(f"{len(records)} frames from {datetime.fromtimestamp(start):%H:%M:%S} "
+          f"to {datetime.fromtimestamp(end):%H:%M:%S} "
+          f"({len(records) / span if span > 0 else 0:.1f} fps average)")
+    print(f"Frames with a face: {np.count_nonzero(records['faces'])}   "
+          f"max faces: {records['faces'].max()}   "
+          f"frames with a smile: {np.count_nonzero(records['smiles'])}")
+    print("States: " + ", ".join(f"{name} {count}" for name, count in zip(STATE_NAMES, states) if count))
+    latency = latency_percentiles(records)
+    print("Latency ms: " + ", ".join(f"p{p} {v}" for p, v in latency.items()))
+
+    minutes, smiles = per_minute(records, 'smiles')
+    capture_minutes, captures = captures_per_minute(records)
+    captures_by_minute = dict(zip(capture_minutes, captures))
+    print(f"\n{'MINUTE':<8}{'SMILE FRAMES':>14}{'PHOTOS':>8}")
+    for minute, count in zip(minutes, smiles):
+        print(f"{datetime.fromtimestamp(minute):%H:%M}   {int(count):>14}{captures_by_minute.get(minute, 0):>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize frame event logs")
+    parser.add_argument('folder', nargs='?', default='event_logs', help="Log folder (default: event_logs)")
+    parser.add_argument('--day', default=datetime.now().strftime('%Y-%m-%d'), help="Day to read (YYYY-MM-DD)")
+    parser.add_argument('--file', default=None, help="Read a single log file instead of a day")
+    args = parser.parse_args()
+
+    if args.file:
+        records = read_log(args.file)
+    else:
+        if not day_files(args.folder, args.day):
+            print(f"Error: No event logs for {args.day} in {args.folder}")
+            return
+        records = read_day(args.folder, args.day)
+    summarize(records)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+"""
+Export Photos - Parallel bulk resize/transcode of captured photos
+
+Streams the capture directory through a process pool, resizing and
+re-encoding every photo to an output preset (progressive JPEG or WebP).
+Each preset writes into its own subfolder (exports/web, exports/thumb, ...)
+with its own manifest, so presets never overwrite or invalidate each
+other's outputs. Reruns are incremental: a photo is skipped when its output
+is already up to date, judged by modification time or by content hash.
+Large photos are decoded at 1/2, 1/4 or 1/8 scale when the preset size
+allows, so workers never hold more pixels than they need.
+
+Usage:
+    python export_photos.py --preset web
+    python export_photos.py --preset thumb --resume hash --guest-map guests.csv --zip
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import cv2
+
+
+# Output presets: longest side in pixels (None keeps the original size),
+# container format and encoder quality
+PRESETS = {
+    'web': {'max_size': 1600, 'format': 'jpg', 'quality': 85, 'progressive': True},
+    'print': {'max_size': None, 'format': 'jpg', 'quality': 95, 'progressive': True},
+    'webp': {'max_size': 2048, 'format': 'webp', 'quality': 80},
+    'thumb': {'max_size': 320, 'format': 'webp', 'quality': 75},
+}
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp')
+
+MANIFEST_NAME = '.export_manifest.json'
+MANIFEST_SAVE_EVERY = 100  # Exports between manifest saves, so a crash keeps most progress
+
+# Reduced decode modes, largest reduction first
+REDUCED_MODES = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+
+def jpeg_size(path):
+    """
+    Read the pixel dimensions from a JPEG header without decoding it.
+
+    Args:
+        path: Path to the image file
+
+    Returns:
+        (width, height), or None if the file is not a readable JPEG
+    """
+    with open(path, 'rb') as f:
+        if f.read(2) != b'\xff\xd8':
+            return None
+        while True:
+            marker = f.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                return None
+            code = marker[1]
+            # Start-of-frame markers carry the image size
+            if 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+                segment = f.read(7)
+                if len(segment) < 7:
+                    return None
+                height = int.from_bytes(segment[3:5], 'big')
+                width = int.from_bytes(segment[5:7], 'big')
+                return width, height
+            length = f.read(2)
+            if len(length) < 2:
+                return None
+            f.seek(int.from_bytes(length, 'big') - 2, os.SEEK_CUR)
+
+
+def decode_for_size(path, max_size):
+    """
+    Decode an image, using a reduced-resolution decode when the output allows.
+
+    Args:
+        path: Path to the image file
+        max_size: Longest side of the output, or None for full size
+
+    Returns:
+        BGR image, or None if it could not be read
+    """
+    flags = cv2.IMREAD_COLOR
+    if max_size:
+        size = jpeg_size(path) if path.lower().endswith(('.jpg', '.jpeg')) else None
+        if size is not None:
+            longest = max(size)
+            for factor, mode in REDUCED_MODES:
+                if longest // factor >= max_size:
+                    flags = mode
+                    break
+    return cv2.imread(path, flags)
+
+
+def transcode(image, preset):
+    """
+    Resize and encode an image according to a preset.
+
+    Args:
+        image: BGR image
+        preset: Entry from PRESETS
+
+    Returns:
+        Encoded bytes, or None if encoding failed
+    """
+    max_size = preset.get('max_size')
+    if max_size:
+        height, width = image.shape[:2]
+        scale = max_size / max(height, width)
+        if scale < 1.0:
+            new_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+            image = cv2.resize(image, new_size, interpolation=cv2.INTER_AREA)
+
+    if preset['format'] == 'webp':
+        params = [cv2.IMWRITE_WEBP_QUALITY, preset.get('quality', 80)]
+    else:
+        params = [cv2.IMWRITE_JPEG_QUALITY, preset.get('quality', 90),
+                  cv2.IMWRITE_JPEG_PROGRESSIVE, int(preset.get('progressive', False)),
+                  cv2.IMWRITE_JPEG_OPTIMIZE, 1]
+
+    ok, buffer = cv2.imencode('.' + preset['format'], image, params)
+    return buffer.tobytes() if ok else None
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """Return the SHA-1 hex digest of a file's contents."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _init_worker():
+    # Each process is one lane of work - stop OpenCV spawning its own threads
+    cv2.setNumThreads(1)
+
+
+def export_one(src, dst, preset, metadata, guest):
+    """
+    Export a single photo. Runs inside a worker process.
+
+    Args:
+        src: Source image path
+        dst: Output image path
+        preset: Entry from PRESETS
+        metadata: 'strip' or 'sidecar'
+        guest: Guest name for the sidecar, or None
+
+    Returns:
+        (src, dst, bytes_written, error) - error is None on success
+    """
+    try:
+        return _export(src, dst, preset, metadata, guest)
+    except (OSError, cv2.error) as e:
+        # Report the failure instead of raising, so one bad file doesn't abort the run
+        return src, dst, 0, str(e)
+
+
+def _export(src, dst, preset, metadata, guest):
+    image = decode_for_size(src, preset.get('max_size'))
+    if image is None:
+        return src, dst, 0, "could not decode"
+
+    data = transcode(image, preset)
+    if data is None:
+        return src, dst, 0, "could not encode"
+
+    # Write to a temporary name first so an interrupted run never leaves a
+    # half-written file that looks up to date
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    tmp_path = dst + '.part'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, dst)
+
+    # Re-encoding drops EXIF, so 'strip' needs no extra work
+    if metadata == 'sidecar':
+        size = jpeg_size(src) if src.lower().endswith(('.jpg', '.jpeg')) else None
+        width, height = size or image.shape[1::-1]
+        sidecar = {
+            'source': os.path.basename(src),
+            'captured': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(os.path.getmtime(src))),
+            'guest': guest,
+            'source_size': [width, height],
+            'preset': preset,
+        }
+        with open(os.path.splitext(dst)[0] + '.json', 'w') as f:
+            json.dump(sidecar, f, indent=2)
+
+    return src, dst, len(data), None
+
+
+def load_guest_map(path):
+    """
+    Read a CSV of "filename,guest" rows.
+
+    Returns:
+        Dictionary mapping photo filename to guest name
+    """
+    guests = {}
+    with open(path, newline='') as f:
+        for row in csv.reader(f):
+            if len(row) >= 2 and row[0] and not row[0].startswith('#'):
+                guests[row[0].strip()] = row[1].strip()
+    return guests
+
+
+def load_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    with open(path + '.part', 'w') as f:
+        json.dump(manifest, f)
+    os.replace(path + '.part', path)
+
+
+def iter_jobs(src_dir, out_dir, preset_name, guests, resume, manifest):
+    """
+    Lazily walk the capture directory and yield photos that need exporting.
+
+    Args:
+        src_dir: Folder with captured photos
+        out_dir: This preset's output folder
+        preset_name: Key into PRESETS
+        guests: Filename to guest mapping
+        resume: 'mtime', 'hash' or 'none'
+        manifest: This preset's manifest - only photos listed in it can be up to date
+
+    Yields:
+        (src, dst, guest, source_hash) tuples
+    """
+    preset = PRESETS[preset_name]
+    with os.scandir(src_dir) as entries:
+        for entry in entries:
+            if not entry.is_file() or not entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+
+            guest = guests.get(entry.name)
+            folder = os.path.join(out_dir, guest) if guest else out_dir
+            stem = os.path.splitext(entry.name)[0]
+            dst = os.path.join(folder, f"{stem}.{preset['format']}")
+
+            source_hash = None
+            previous = manifest.get(entry.name)
+            if resume == 'mtime':
+                if previous is not None and os.path.exists(dst) and os.path.getmtime(dst) >= entry.stat().st_mtime:
+                    continue
+            elif resume == 'hash':
+                source_hash = file_hash(entry.path)
+                if previous is not None and previous.get('sha1') == source_hash and os.path.exists(dst):
+                    continue
+
+            yield entry.path, dst, guest, source_hash
+
+
+def zip_guest_folders(out_dir, guests):
+    """Package every guest's exported photos into <guest>.zip."""
+    for guest in sorted(set(guests.values())):
+        folder = os.path.join(out_dir, guest)
+        if not os.path.isdir(folder):
+            continue
+        archive = os.path.join(out_dir, f"{guest}.zip")
+        # Photos are already compressed, so store them as-is
+        with zipfile.ZipFile(archive, 'w', compression=zipfile.ZIP_STORED) as zf:
+            for name in sorted(os.listdir(folder)):
+                zf.write(os.path.join(folder, name), arcname=name)
+        print(f"Packaged: {archive}")
+
+
+def export_photos(src_dir, out_dir, preset_name='web', workers=None, resume='mtime',
+                  metadata='strip', guest_map=None, make_zips=False):
+    """
+    Export every photo in src_dir to out_dir/<preset> using a process pool.
+
+    Args:
+        src_dir: Folder with captured photos
+        out_dir: Folder for the exported photos (one subfolder per preset)
+        preset_name: Key into PRESETS
+        workers: Number of worker processes (defaults to the CPU count)
+        resume: 'mtime', 'hash' or 'none' - how to detect up-to-date outputs
+        metadata: 'strip' or 'sidecar'
+        guest_map: Optional CSV mapping filenames to guests (one subfolder each)
+        make_zips: Package each guest folder into a zip file
+
+    Returns:
+        (exported, failed) counts
+    """
+    preset = PRESETS[preset_name]
+    guests = load_guest_map(guest_map) if guest_map else {}
+    out_dir = os.path.join(out_dir, preset_name)
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = load_manifest(out_dir)
+
+    workers = workers or os.cpu_count() or 1
+    max_pending = workers * 2  # Bounded queue keeps memory flat for huge folders
+    exported = failed = 0
+    hashes = {}
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        pending = set()
+
+        def collect(done):
+            nonlocal exported, failed
+            for future in done:
+                src, dst, size, error = future.result()
+                name = os.path.basename(src)
+                source_hash = hashes.pop(name, None)
+                if error:
+                    failed += 1
+                    print(f"Failed: {src} ({error})")
+                    continue
+                exported += 1
+                manifest[name] = {'sha1': source_hash}
+                if exported % MANIFEST_SAVE_EVERY == 0:
+                    save_manifest(out_dir, manifest)
+
+        for src, dst, guest, source_hash in iter_jobs(src_dir, out_dir, preset_name, guests, resume, manifest):
+            hashes[os.path.basename(src)] = source_hash
+            pending.add(pool.submit(export_one, src, dst, preset, metadata, guest))
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+
+        done, _ = wait(pending)
+        collect(done)
+
+    save_manifest(out_dir, manifest)
+
+    if make_zips and guests:
+        zip_guest_folders(out_dir, guests)
+
+    elapsed = time.perf_counter() - started
+    print(f"Exported {exported} photos ({failed} failed) in {elapsed:.1f}s")
+    return exported, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk export captured photos")
+    parser.add_argument('--src', default='captured_smiles', help="Folder with captured photos")
+    parser.add_argument('--out', default='exports', help="Output folder, one subfolder per preset (default: exports)")
+    parser.add_argument('--preset', default='web', choices=sorted(PRESETS), help="Output preset")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--resume', default='mtime', choices=('mtime', 'hash', 'none'),
+                        help="How to skip photos that are already exported (default: mtime)")
+    parser.add_argument('--metadata', default='strip', choices=('strip', 'sidecar'),
+                        help="Drop metadata, or write a JSON sidecar next to each photo")
+    parser.add_argument('--guest-map', default=None, help="CSV of filename,guest rows for per-guest folders")
+    parser.add_argument('--zip', action='store_true', help="Package each guest folder into a zip file")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.src):
+        print(f"Error: Folder not found: {args.src}")
+        return
+
+    export_photos(args.src, args.out, args.preset, args.workers, args.resume,
+                  args.metadata, args.guest_map, args.zip)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,497 @@
+"""
+Frame Bus - Share one camera between several apps through shared memory
+
+Only one process can open /dev/video0. The bus daemon owns the camera and
+publishes every frame (plus its grayscale version, so clients don't all
+repeat the conversion) into a multiprocessing.shared_memory ring:
+
+    [bus header][slot headers][BGR frames x slots][gray frames x slots]
+
+Each slot header carries the sequence number of the frame inside it. The
+writer zeroes it while copying, so a reader can tell whether the slot
+changed under it. Clients attach the ring as NumPy views without copying,
+and either poll for the latest sequence number or wait for a notification
+datagram on a Unix socket.
+
+Start the daemon, then run the apps as usual - open_capture() picks the bus
+up automatically whenever it is running:
+
+    python frame_bus.py --device 0
+    python capture_smile.py
+    python app.py
+"""
+
+import argparse
+import itertools
+import os
+import select
+import socket
+import tempfile
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import cv2
+import numpy as np
+
+from camera_profile import DEFAULT_PROFILE_PATH, apply_profile, load_profile
+from frame_source import capture_from_env
+
+
+DEFAULT_BUS_NAME = 'smile_frame_bus'
+BUS_ENV_VAR = 'SMILE_FRAME_BUS'
+MAGIC = 0x534D4653  # "SFMS"
+
+_client_ids = itertools.count()
+
+HEADER_DTYPE = np.dtype([
+    ('magic', '<u4'),
+    ('slots', '<u4'),
+    ('height', '<u4'),
+    ('width', '<u4'),
+    ('latest_seq', '<u8'),
+    ('fps', '<f8'),
+    ('pid', '<u8'),
+    ('reserved', '<u8', (3,)),
+])
+SLOT_DTYPE = np.dtype([
+    ('seq', '<u8'),        # 0 while the slot is being written
+    ('timestamp', '<f8'),  # time.time() when the frame was captured
+])
+
+
+def _socket_path(name, client=None):
+    suffix = f"-{client}" if client is not None else ''
+    return os.path.join(tempfile.gettempdir(), f"{name}{suffix}.sock")
+
+
+def _layout(shm_buf, slots, height, width, offset=HEADER_DTYPE.itemsize):
+    """Build the NumPy views over a bus buffer."""
+    slot_meta = np.ndarray((slots,), dtype=SLOT_DTYPE, buffer=shm_buf, offset=offset)
+    offset += SLOT_DTYPE.itemsize * slots
+    frames = np.ndarray((slots, height, width, 3), dtype=np.uint8, buffer=shm_buf, offset=offset)
+    offset += frames.nbytes
+    grays = np.ndarray((slots, height, width), dtype=np.uint8, buffer=shm_buf, offset=offset)
+    return slot_meta, frames, grays
+
+
+def _bus_size(slots, height, width):
+    return HEADER_DTYPE.itemsize + SLOT_DTYPE.itemsize * slots + slots * height * width * 4
+
+
+def _attach(name):
+    """Attach to an existing segment without letting this process unlink it on exit."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 every attach is tracked and would be destroyed
+        # when this client exits, taking the bus down with it
+        shm = shared_memory.SharedMemory(name=name)
+        header = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=shm.buf)
+        if int(header['pid'][0]) != os.getpid():
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        del header
+        return shm
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Exists, but belongs to another user
+    return True
+
+
+def _owner_alive(shm):
+    """True if the segment is a frame bus whose daemon process is still running."""
+    header = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=shm.buf)
+    magic, pid = int(header['magic'][0]), int(header['pid'][0])
+    del header
+    return magic == MAGIC and pid > 0 and _pid_alive(pid)
+
+
+def _remove_stale(name):
+    """
+    Unlink a bus segment left behind by a daemon that died without cleaning up.
+
+    Raises:
+        FileExistsError: If the segment's daemon is still running
+    """
+    try:
+        # Tracked attach on purpose: unlink() below also drops the registration
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    alive = _owner_alive(shm)
+    shm.close()
+    if alive:
+        raise FileExistsError(f"Frame bus '{name}' is already running")
+    shm.unlink()
+    print(f"Removed stale frame bus '{name}'")
+
+
+class FrameBusPublisher:
+    """
+    Owner side of the bus: creates the ring and publishes frames into it.
+
+    Args:
+        width, height: Frame size
+        slots: Number of frames kept in the ring
+        name: Shared memory / socket name
+    """
+
+    def __init__(self, width, height, slots=4, name=DEFAULT_BUS_NAME):
+        self.name = name
+        self.slots = slots
+        _remove_stale(name)
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=_bus_size(slots, height, width))
+        self.header = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=self.shm.buf)
+        self.header[0] = (MAGIC, slots, height, width, 0, 0.0, os.getpid(), (0, 0, 0))
+        self.slot_meta, self.frames, self.grays = _layout(self.shm.buf, slots, height, width)
+        self.seq = 0
+
+        # Clients register their own datagram socket here to be woken per frame
+        self.sock_path = _socket_path(name)
+        if os.path.exists(self.sock_path):
+            os.unlink(self.sock_path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(self.sock_path)
+        self.sock.setblocking(False)
+        self.subscribers = set()
+
+    def _accept_subscribers(self):
+        while True:
+            try:
+                message, address = self.sock.recvfrom(64)
+            except (BlockingIOError, OSError):
+                return
+            if message == b'sub' and address:
+                self.subscribers.add(address)
+            elif message == b'unsub':
+                self.subscribers.discard(address)
+
+    def _notify(self):
+        payload = self.seq.to_bytes(8, 'little')
+        for address in list(self.subscribers):
+            try:
+                self.sock.sendto(payload, address)
+            except BlockingIOError:
+                pass  # Client is slow to drain; it will still see the latest seq
+            except OSError:
+                self.subscribers.discard(address)  # Client has gone away
+
+    def publish(self, frame, fps=0.0):
+        """
+        Copy a frame (and its grayscale version) into the next ring slot.
+
+        Returns:
+            The frame's sequence number
+        """
+        self.seq += 1
+        slot = self.seq % self.slots
+        meta = self.slot_meta[slot:slot + 1]
+
+        meta['seq'] = 0  # Mark the slot as being written
+        np.copyto(self.frames[slot], frame)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self.grays[slot])
+        meta['timestamp'] = time.time()
+        meta['seq'] = self.seq
+
+        self.header['latest_seq'] = self.seq
+        self.header['fps'] = fps
+
+        self._accept_subscribers()
+        self._notify()
+        return self.seq
+
+    def close(self):
+        """Remove the ring and socket."""
+        self.sock.close()
+        if os.path.exists(self.sock_path):
+            os.unlink(self.sock_path)
+        del self.header, self.slot_meta, self.frames, self.grays
+        self.shm.close()
+        self.shm.unlink()
+
+
+class FrameBusClient:
+    """
+    Reader side of the bus: zero-copy NumPy views of the published frames.
+
+    Args:
+        name: Bus name
+        notify: Register for per-frame wake-ups instead of polling
+    """
+
+    def __init__(self, name=DEFAULT_BUS_NAME, notify=True):
+        self.name = name
+        self.shm = _attach(name)
+        self.header = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=self.shm.buf)
+        if int(self.header['magic'][0]) != MAGIC:
+            del self.header
+            self.shm.close()
+            raise ValueError(f"Shared memory '{name}' is not a frame bus")
+        if not _owner_alive(self.shm):
+            del self.header
+            self.shm.close()
+            raise ValueError(f"Frame bus '{name}' was left behind by a daemon that is no longer running")
+
+        self.slots = int(self.header['slots'][0])
+        self.height = int(self.header['height'][0])
+        self.width = int(self.header['width'][0])
+        self.slot_meta, self.frames, self.grays = _layout(self.shm.buf, self.slots, self.height, self.width)
+
+        self.sock = None
+        if notify:
+            self.sock_path = _socket_path(name, f"{os.getpid()}-{next(_client_ids)}")
+            if os.path.exists(self.sock_path):
+                os.unlink(self.sock_path)
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self.sock.bind(self.sock_path)
+            self.sock.setblocking(False)
+            try:
+                self.sock.sendto(b'sub', _socket_path(name))
+            except OSError:
+                pass  # Daemon socket missing - fall back to polling
+
+    @property
+    def fps(self):
+        return float(self.header['fps'][0])
+
+    def latest_seq(self):
+        return int(self.header['latest_seq'][0])
+
+    def is_current(self, seq):
+        """True while the slot holding frame `seq` has not been overwritten."""
+        return seq > 0 and int(self.slot_meta['seq'][seq % self.slots]) == seq
+
+    def latest(self):
+        """
+        Zero-copy views of the newest frame.
+
+        The views point into the ring: check is_current(seq) after using
+        them, or copy them, if the work takes longer than a few frames.
+
+        Returns:
+            (seq, frame, gray) - seq is 0 and the views None before the first frame
+        """
+        for _ in range(self.slots):
+            seq = self.latest_seq()
+            if seq == 0:
+                return 0, None, None
+            slot = seq % self.slots
+            if self.is_current(seq):
+                return seq, self.frames[slot], self.grays[slot]
+        return 0, None, None
+
+    def wait(self, last_seq=0, timeout=1.0):
+        """
+        Block until a frame newer than last_seq is published.
+
+        Returns:
+            Same as latest(), or (0, None, None) on timeout
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            seq = self.latest_seq()
+            if seq > last_seq:
+                return self.latest()
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return 0, None, None
+
+            if self.sock is not None:
+                ready, _, _ = select.select([self.sock], [], [], remaining)
+                # Drain queued notifications; the header has the newest seq anyway
+                while ready:
+                    try:
+                        self.sock.recv(8)
+                    except BlockingIOError:
+                        break
+            else:
+                time.sleep(min(0.002, remaining))
+
+    def read_copy(self, last_seq=0, timeout=1.0):
+        """
+        Wait for a newer frame and return private copies of it.
+
+        Copies are re-validated, so a frame torn by the writer is never returned.
+
+        Returns:
+            (seq, frame, gray) or (0, None, None) on timeout
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            seq, frame, gray = self.wait(last_seq, max(0.0, deadline - time.monotonic()))
+            if frame is None:
+                return 0, None, None
+            frame, gray = frame.copy(), gray.copy()
+            if self.is_current(seq):
+                return seq, frame, gray
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.sock.sendto(b'unsub', _socket_path(self.name))
+            except OSError:
+                pass
+            self.sock.close()
+            if os.path.exists(self.sock_path):
+                os.unlink(self.sock_path)
+        del self.header, self.slot_meta, self.frames, self.grays
+        self.shm.close()
+
+
+class BusCapture:
+    """
+    cv2.VideoCapture look-alike that reads from the frame bus.
+
+    read() returns a private copy (the apps draw on their frames); the
+    matching grayscale frame of the last read() is available as last_gray.
+    """
+
+    def __init__(self, name=DEFAULT_BUS_NAME, timeout=2.0):
+        self.name = name
+        self.timeout = timeout
+        self.last_seq = 0
+        self.last_gray = None
+        try:
+            self.client = FrameBusClient(name)
+        except (FileNotFoundError, ValueError):
+            self.client = None
+
+    def isOpened(self):
+        return self.client is not None
+
+    def read(self):
+        if self.client is None:
+            return False, None
+        seq, frame, gray = self.client.read_copy(self.last_seq, self.timeout)
+        if frame is None:
+            return False, None
+        self.last_seq = seq
+        self.last_gray = gray
+        return True, frame
+
+    def get(self, prop):
+        if self.client is None:
+            return 0.0
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.client.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.client.height)
+        if prop == cv2.CAP_PROP_FPS:
+            return self.client.fps
+        return 0.0
+
+    def set(self, prop, value):
+        # The daemon owns the camera settings
+        return False
+
+    def release(self):
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+
+
+def bus_available(name=DEFAULT_BUS_NAME):
+    """True if a frame bus with this name exists and its daemon is still running."""
+    try:
+        shm = _attach(name)
+    except FileNotFoundError:
+        return False
+    alive = _owner_alive(shm)
+    shm.close()
+    return alive
+
+
+def open_capture(index=0):
+    """
+    Open the frame source for an app.
+
+    Uses the test source named by $SMILE_FRAME_SOURCE (see frame_source),
+    then the frame bus named by $SMILE_FRAME_BUS, or the default bus when its
+    daemon is running, and otherwise opens camera `index` directly.
+
+    Returns:
+        PacedCapture, BusCapture or cv2.VideoCapture
+    """
+    test_source = capture_from_env()
+    if test_source is not None:
+        return test_source
+
+    name = os.environ.get(BUS_ENV_VAR)
+    if name or bus_available():
+        capture = BusCapture(name or DEFAULT_BUS_NAME)
+        if capture.isOpened():
+            print(f"Using frame bus '{capture.name}'")
+        else:
+            print(f"Error: Frame bus '{capture.name}' is not running")
+        return capture
+    return cv2.VideoCapture(index)
+
+
+def run_daemon(device=None, slots=4, name=DEFAULT_BUS_NAME, profile_path=DEFAULT_PROFILE_PATH):
+    """
+    Own the camera and publish frames until interrupted.
+
+    Args:
+        device: Camera index; None uses the profile's device, else 0
+    """
+    profile = load_profile(profile_path)
+    if device is None:
+        device = profile.get('device', 0) if profile else 0
+    camera = cv2.VideoCapture(device)
+    if not camera.isOpened():
+        print("Error: Could not access the webcam!")
+        return
+    if profile:
+        apply_profile(camera, profile)
+
+    success, frame = camera.read()
+    if not success:
+        print("Error: Failed to read frame from camera!")
+        camera.release()
+        return
+
+    height, width = frame.shape[:2]
+    try:
+        publisher = FrameBusPublisher(width, height, slots, name)
+    except FileExistsError as e:
+        print(f"Error: {e}")
+        camera.release()
+        return
+    print(f"Frame bus '{name}' publishing {width}x{height} frames ({slots} slots). Press Ctrl+C to stop.")
+
+    fps = 0.0
+    last = time.perf_counter()
+    try:
+        while success:
+            publisher.publish(frame, fps)
+            success, frame = camera.read()
+            now = time.perf_counter()
+            fps += 0.1 * (1.0 / max(now - last, 1e-6) - fps)
+            last = now
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"\nStopping frame bus after {publisher.seq} frames")
+        publisher.close()
+        camera.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Share one camera between several apps")
+    parser.add_argument('--device', type=int, default=None,
+                        help="Camera index (default: the camera profile's device, else 0)")
+    parser.add_argument('--slots', type=int, default=4, help="Frames kept in the ring (default: 4)")
+    parser.add_argument('--name', default=os.environ.get(BUS_ENV_VAR, DEFAULT_BUS_NAME), help="Bus name")
+    parser.add_argument('--camera-profile', default=DEFAULT_PROFILE_PATH, help="Camera profile to apply")
+    args = parser.parse_args()
+    run_daemon(args.device, args.slots, args.name, args.camera_profile)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Frame Source - Camera-free frame sources for testing
+
+Stand-ins for cv2.VideoCapture that need no webcam:
+
+    SMILE_FRAME_SOURCE=synthetic             # generated 640x480 frames
+    SMILE_FRAME_SOURCE=synthetic:1280x720
+    SMILE_FRAME_SOURCE=party.mp4             # replay a recording
+    SMILE_FRAME_SOURCE=captured_smiles       # replay a folder of photos
+
+SMILE_SOURCE_FPS sets the frame rate (default 30). Frames are paced like a
+real camera: read() blocks until the next frame is due, and concurrent
+readers share the stream, so each frame goes to one reader, exactly as
+with a physical device.
+"""
+
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+SOURCE_ENV_VAR = 'SMILE_FRAME_SOURCE'
+FPS_ENV_VAR = 'SMILE_SOURCE_FPS'
+MAX_REPLAY_FRAMES = 300  # Replayed frames are held decoded in memory
+
+
+class PacedCapture:
+    """
+    cv2.VideoCapture look-alike that loops over in-memory frames at a fixed rate.
+
+    Args:
+        frames: List of BGR frames (all the same size)
+        fps: Frames delivered per second
+    """
+
+    def __init__(self, frames, fps=30.0):
+        self.frames = frames
+        self.fps = fps
+        self.index = 0
+        self._period = 1.0 / fps
+        self._next = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def isOpened(self):
+        return bool(self.frames)
+
+    def read(self):
+        if not self.frames:
+            return False, None
+        with self._lock:
+            # Block until the frame is due; a late reader gets the current frame at once
+            delay = self._next - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self._next = max(self._next + self._period, time.perf_counter())
+            frame = self.frames[self.index % len(self.frames)]
+            self.index += 1
+        return True, frame.copy()
+
+    def get(self, prop):
+        if not self.frames:
+            return 0.0
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.frames[0].shape[1])
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.frames[0].shape[0])
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        return 0.0
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        self.frames = []
+
+
+def synthetic_frames(width=640, height=480, count=60, seed=0):
+    """
+    Generate a loop of textured, moving frames.
+
+    Noise and gradients give the cascades roughly the work a real scene does.
+    """
+    rng = np.random.default_rng(seed)
+    texture = rng.integers(0, 256, (height, width * 2, 3), dtype=np.uint8)
+    texture = cv2.GaussianBlur(texture, (0, 0), 3)
+    gradient = np.linspace(0, 120, width * 2, dtype=np.uint8)[None, :, None]
+    texture = cv2.add(texture, np.broadcast_to(gradient, texture.shape).copy())
+
+    frames = []
+    for i in range(count):
+        offset = (i * width) // count
+        frame = np.ascontiguousarray(texture[:, offset:offset + width])
+        cv2.putText(frame, f"SYNTHETIC {i:03d}", (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+        frames.append(frame)
+    return frames
+
+
+def replay_frames(path, max_frames=MAX_REPLAY_FRAMES):
+    """
+    Load frames from a video file or a folder of images.
+
+    Images are resized to the size of the first one so the stream is uniform.
+    """
+    frames = []
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            if len(frames) >= max_frames:
+                break
+            image = cv2.imread(os.path.join(path, name), cv2.IMREAD_COLOR)
+            if image is None:
+                continue
+            if frames and image.shape != frames[0].shape:
+                image = cv2.resize(image, (frames[0].shape[1], frames[0].shape[0]), interpolation=cv2.INTER_AREA)
+            frames.append(image)
+    else:
+        video = cv2.VideoCapture(path)
+        while len(frames) < max_frames:
+            ok, frame = video.read()
+            if not ok:
+                break
+            frames.append(frame)
+        video.release()
+    return frames
+
+
+def capture_from_env():
+    """
+    Build the test frame source named by $SMILE_FRAME_SOURCE.
+
+    Returns:
+        PacedCapture, or None when the variable is not set
+    """
+    spec = os.environ.get(SOURCE_ENV_VAR)
+    if not spec:
+        return None
+    fps = float(os.environ.get(FPS_ENV_VAR, 30))
+
+    if spec == 'synthetic' or spec.startswith('synthetic:'):
+        width, height = 640, 480
+        if ':' in spec:
+            width, height = (int(v) for v in spec.split(':', 1)[1].lower().split('x'))
+        frames = synthetic_frames(width, height)
+    else:
+        frames = replay_frames(spec)
+        if not frames:
+            print(f"Error: No frames could be read from {spec}")
+
+    capture = PacedCapture(frames, fps)
+    if capture.isOpened():
+        height, width = frames[0].shape[:2]
+        print(f"Using test frame source '{spec}' ({len(frames)} frames, {width}x{height} @ {fps:g} fps)")
+    return capture
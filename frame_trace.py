@@ -0,0 +1,210 @@
+"""
+Frame Trace - Opt-in Chrome/Perfetto trace-event timeline for the frame loops
+
+Spans (capture, grayscale, cascades, overlays, display, encode, disk write)
+are recorded into a fixed-size in-memory ring, tagged with the frame sequence
+number, and dumped as Chrome trace-event JSON. Open the file in
+chrome://tracing or https://ui.perfetto.dev to see exactly why a frame stalled.
+
+When tracing is off the loops use NULL_TRACER: its spans are a shared no-op
+object and wrap() hands back the original function, so nothing is timed,
+allocated or stored.
+"""
+
+import atexit
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+
+
+class _Span:
+    """Context manager that records one complete ("X") event."""
+
+    __slots__ = ('tracer', 'name', 'frame', 'start')
+
+    def __init__(self, tracer, name, frame):
+        self.tracer = tracer
+        self.name = name
+        self.frame = frame
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer.record(self.name, self.start, time.perf_counter_ns(), self.frame)
+        return False
+
+
+class _NullSpan:
+    """Shared do-nothing span used when tracing is disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class FrameTracer:
+    """
+    Record timing spans into a ring buffer and export them as a Chrome trace.
+
+    Args:
+        capacity: Number of spans kept; the oldest are overwritten first
+        path: Default output file for dump()
+    """
+
+    enabled = True
+
+    def __init__(self, capacity=65536, path='frame_trace.json'):
+        self.capacity = capacity
+        self.path = path
+        self.frame = None  # Sequence number of the frame being processed
+        self._ring = [None] * capacity
+        self._counter = itertools.count()  # next() is atomic, so writers need no lock
+        self._thread_names = {}
+        self._pid = os.getpid()
+
+    def begin_frame(self, seq):
+        """Tag subsequent spans with this frame sequence number."""
+        self.frame = seq
+
+    def span(self, name, frame=None):
+        """
+        Time a block of code.
+
+        Args:
+            name: Span name shown on the timeline
+            frame: Frame sequence number (defaults to the current frame)
+        """
+        return _Span(self, name, self.frame if frame is None else frame)
+
+    def wrap(self, func, name=None):
+        """
+        Return a version of func that records a span around every call.
+
+        Args:
+            func: Function to time
+            name: Span name (defaults to the function name)
+        """
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def traced(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(span_name, start, time.perf_counter_ns(), self.frame)
+
+        return traced
+
+    def record(self, name, start_ns, end_ns, frame=None):
+        """Store one finished span in the ring."""
+        tid = threading.get_native_id()
+        if tid not in self._thread_names:
+            self._thread_names[tid] = threading.current_thread().name
+        index = next(self._counter)
+        self._ring[index % self.capacity] = (name, start_ns, end_ns, tid, frame)
+
+    def events(self):
+        """Return the buffered spans, oldest first."""
+        spans = [event for event in self._ring if event is not None]
+        spans.sort(key=lambda event: event[1])
+        return spans
+
+    def to_chrome_trace(self):
+        """
+        Build the Chrome trace-event document.
+
+        Returns:
+            Dictionary ready to be serialized with json.dump
+        """
+        trace_events = []
+        for tid, thread_name in list(self._thread_names.items()):
+            trace_events.append({'name': 'thread_name', 'ph': 'M', 'pid': self._pid, 'tid': tid,
+                                 'args': {'name': thread_name}})
+
+        for name, start_ns, end_ns, tid, frame in self.events():
+            event = {'name': name, 'ph': 'X', 'pid': self._pid, 'tid': tid,
+                     'ts': start_ns / 1000.0, 'dur': (end_ns - start_ns) / 1000.0}
+            if frame is not None:
+                event['args'] = {'frame': frame}
+            trace_events.append(event)
+
+        return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+    def dump(self, path=None):
+        """
+        Write the buffered spans to disk as Chrome trace JSON.
+
+        Args:
+            path: Output file (defaults to the tracer's path)
+
+        Returns:
+            The path written
+        """
+        path = path or self.path
+        with open(path, 'w') as f:
+            json.dump(self.to_chrome_trace(), f)
+        print(f"Trace saved: {path}")
+        return path
+
+    def dump_on_exit(self, path=None):
+        """Register an atexit hook that dumps the ring when the process ends."""
+        atexit.register(self.dump, path)
+
+
+class NullTracer:
+    """Tracer stand-in used when tracing is disabled."""
+
+    enabled = False
+    frame = None
+
+    def begin_frame(self, seq):
+        pass
+
+    def span(self, name, frame=None):
+        return _NULL_SPAN
+
+    def wrap(self, func, name=None):
+        return func
+
+    def record(self, name, start_ns, end_ns, frame=None):
+        pass
+
+    def to_chrome_trace(self):
+        return {'traceEvents': []}
+
+    def dump(self, path=None):
+        return None
+
+    def dump_on_exit(self, path=None):
+        pass
+
+
+NULL_TRACER = NullTracer()
+
+
+def tracer_from_env(var='SMILE_TRACE', capacity=65536):
+    """
+    Create a tracer if the given environment variable names an output file.
+
+    Returns:
+        A FrameTracer dumping to that file on exit, or NULL_TRACER
+    """
+    path = os.environ.get(var)
+    if not path:
+        return NULL_TRACER
+    tracer = FrameTracer(capacity=capacity, path=path)
+    tracer.dump_on_exit()
+    return tracer
@@ -0,0 +1,187 @@
+"""
+Group Smiles - Parallel per-face smile detection and group-shot trigger policies
+
+Smile detection fans out over the detected face regions with a thread pool.
+OpenCV releases the GIL inside detectMultiScale, so the per-face cascade
+passes really do run side by side. CascadeClassifier objects are not safe to
+share between threads, so every worker thread lazily loads its own copy.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from frame_trace import NULL_TRACER
+
+
+SMILE_CASCADE_PATH = cv2.data.haarcascades + 'haarcascade_smile.xml'
+
+
+class ParallelSmileDetector:
+    """
+    Run the smile cascade over many face regions at once.
+
+    Args:
+        max_workers: Number of worker threads (defaults to the CPU count, capped at 8);
+                     0 or 1 runs the cascade sequentially without a pool
+        scale_factor: Smile cascade scaleFactor
+        min_neighbors: Smile cascade minNeighbors
+        tracer: FrameTracer that records one span per smile cascade pass
+    """
+
+    def __init__(self, max_workers=None, scale_factor=1.8, min_neighbors=20, tracer=NULL_TRACER):
+        if max_workers is None:
+            max_workers = min(8, os.cpu_count() or 1)
+        self.max_workers = max_workers
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.tracer = tracer
+        self._local = threading.local()
+        self._pool = None
+        if max_workers > 1:
+            self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='smile')
+
+    def _cascade(self):
+        # One classifier per thread - CascadeClassifier is not thread-safe
+        cascade = getattr(self._local, 'cascade', None)
+        if cascade is None:
+            cascade = cv2.CascadeClassifier(SMILE_CASCADE_PATH)
+            self._local.cascade = cascade
+        return cascade
+
+    def _detect_roi(self, roi_gray):
+        with self.tracer.span("smile_cascade"):
+            return self._cascade().detectMultiScale(
+                roi_gray, scaleFactor=self.scale_factor, minNeighbors=self.min_neighbors)
+
+    def detect(self, gray, faces):
+        """
+        Detect smiles inside every face rectangle.
+
+        Args:
+            gray: Grayscale frame
+            faces: Face rectangles (x, y, w, h) from the face cascade
+
+        Returns:
+            List of smile rectangle arrays, one per face, in face order
+        """
+        rois = [gray[y:y + h, x:x + w] for (x, y, w, h) in faces]
+
+        # A single face is not worth the hand-off to the pool
+        if len(rois) <= 1 or self._pool is None:
+            return [self._detect_roi(roi) for roi in rois]
+
+        return list(self._pool.map(self._detect_roi, rois))
+
+    def close(self):
+        """Shut down the worker threads."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+
+
+class TriggerPolicy:
+    """
+    Decide when a group of faces is smiling enough to start the countdown.
+
+    Modes:
+        any      - at least one face is smiling (the original behaviour)
+        all      - every detected face is smiling
+        at_least - at least `count` faces are smiling
+        fraction - at least `fraction` of the detected faces are smiling
+
+    The condition has to hold without interruption for `hold_ms` milliseconds
+    before the policy fires.
+    """
+
+    MODES = ('any', 'all', 'at_least', 'fraction')
+
+    def __init__(self, mode='any', count=1, fraction=0.5, hold_ms=0):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown trigger mode: {mode!r} (expected one of {', '.join(self.MODES)})")
+        if count < 1:
+            raise ValueError("count must be at least 1")
+        if not 0.0 < fraction <= 1.0:
+            raise ValueError("fraction must be in (0, 1]")
+        self.mode = mode
+        self.count = count
+        self.fraction = fraction
+        self.hold_ms = hold_ms
+        self._since = None
+
+    @classmethod
+    def from_string(cls, spec, hold_ms=0):
+        """
+        Build a policy from a command-line spec.
+
+        Accepted forms: "any", "all", "at_least:N" and "fraction:F".
+        """
+        mode, _, value = spec.replace('-', '_').partition(':')
+        if mode == 'at_least':
+            return cls(mode, count=int(value or 1), hold_ms=hold_ms)
+        if mode == 'fraction':
+            return cls(mode, fraction=float(value or 0.5), hold_ms=hold_ms)
+        if value:
+            raise ValueError(f"Trigger mode {mode!r} takes no value (got {spec!r})")
+        return cls(mode, hold_ms=hold_ms)
+
+    def is_satisfied(self, smile_flags):
+        """
+        Check the smile condition for a single frame.
+
+        Args:
+            smile_flags: One boolean per detected face
+
+        Returns:
+            True if this frame meets the policy
+        """
+        total = len(smile_flags)
+        smiling = sum(1 for flag in smile_flags if flag)
+        if total == 0:
+            return False
+        if self.mode == 'any':
+            return smiling > 0
+        if self.mode == 'all':
+            return smiling == total
+        if self.mode == 'at_least':
+            return smiling >= self.count
+        return smiling / total >= self.fraction
+
+    def update(self, smile_flags, now=None):
+        """
+        Feed one frame of smile results and report whether to trigger.
+
+        Args:
+            smile_flags: One boolean per detected face
+            now: Timestamp in seconds (defaults to time.monotonic())
+
+        Returns:
+            True once the condition has held steadily for hold_ms
+        """
+        if not self.is_satisfied(smile_flags):
+            self._since = None
+            return False
+
+        if now is None:
+            now = time.monotonic()
+        if self._since is None:
+            self._since = now
+        return (now - self._since) * 1000.0 >= self.hold_ms
+
+    def reset(self):
+        """Forget any partially held smile (e.g. after a capture)."""
+        self._since = None
+
+    def describe(self):
+        """Short human-readable summary for the console."""
+        if self.mode == 'at_least':
+            text = f"at least {self.count} faces"
+        elif self.mode == 'fraction':
+            text = f"{self.fraction:.0%} of faces"
+        else:
+            text = f"{self.mode} faces"
+        if self.hold_ms:
+            text += f" for {self.hold_ms} ms"
+        return text
@@ -0,0 +1,134 @@
+"""
+Load Shedding - Degrade per-frame work to hold a target frame rate
+
+A small feedback controller watches how long each frame takes to process
+and compares it with the budget for the target FPS. When frames run over
+budget it steps down to the next degradation level; when there is clear
+headroom again it steps back up. Degrading is quick and restoring is slow,
+and the two thresholds are far apart, so the level does not flap.
+
+Levels are cumulative and applied in this order:
+    1-2  detection resolution (0.75x, then 0.5x)
+    3-4  smile cascade frequency (every 2nd, then every 3rd frame)
+    5    overlay effects (gradients, glow, shadow, pulse animation)
+    6-7  stream JPEG quality (70, then 50)
+"""
+
+import time
+
+
+LEVELS = [
+    {'name': 'full quality', 'detect_scale': 1.0, 'smile_every': 1, 'effects': True, 'jpeg_quality': 95},
+    {'name': 'detection 0.75x', 'detect_scale': 0.75, 'smile_every': 1, 'effects': True, 'jpeg_quality': 95},
+    {'name': 'detection 0.5x', 'detect_scale': 0.5, 'smile_every': 1, 'effects': True, 'jpeg_quality': 95},
+    {'name': 'smiles every 2nd frame', 'detect_scale': 0.5, 'smile_every': 2, 'effects': True, 'jpeg_quality': 95},
+    {'name': 'smiles every 3rd frame', 'detect_scale': 0.5, 'smile_every': 3, 'effects': True, 'jpeg_quality': 95},
+    {'name': 'effects off', 'detect_scale': 0.5, 'smile_every': 3, 'effects': False, 'jpeg_quality': 95},
+    {'name': 'JPEG quality 70', 'detect_scale': 0.5, 'smile_every': 3, 'effects': False, 'jpeg_quality': 70},
+    {'name': 'JPEG quality 50', 'detect_scale': 0.5, 'smile_every': 3, 'effects': False, 'jpeg_quality': 50},
+]
+
+
+class LoadShedder:
+    """
+    Feedback controller that picks a degradation level from frame times.
+
+    Args:
+        target_fps: Frame rate to hold
+        degrade_after: Consecutive over-budget frames before stepping down
+        restore_after: Consecutive frames with headroom before stepping up
+        headroom: Step up only when frames take less than this share of the budget
+        smoothing: Weight of the newest sample in the moving average
+        max_level: Deepest level allowed (defaults to the last one)
+        enabled: False pins the controller at full quality
+    """
+
+    def __init__(self, target_fps=30, degrade_after=10, restore_after=90, headroom=0.6,
+                 smoothing=0.2, max_level=None, enabled=True):
+        self.budget = 1.0 / target_fps
+        self.degrade_after = degrade_after
+        self.restore_after = restore_after
+        self.headroom = headroom
+        self.smoothing = smoothing
+        self.max_level = len(LEVELS) - 1 if max_level is None else min(max_level, len(LEVELS) - 1)
+        self.enabled = enabled
+        self.level = 0
+        self.average = None
+        self._over = 0
+        self._under = 0
+        self._started = None
+
+    @property
+    def settings(self):
+        """Knob values for the current level."""
+        return LEVELS[self.level]
+
+    def frame_start(self):
+        """Mark the start of one frame's processing."""
+        self._started = time.perf_counter()
+
+    def frame_end(self):
+        """
+        Mark the end of the frame started with frame_start().
+
+        Returns:
+            True if the level changed
+        """
+        if self._started is None:
+            return False
+        elapsed = time.perf_counter() - self._started
+        self._started = None
+        return self.update(elapsed)
+
+    def update(self, frame_time):
+        """
+        Feed one frame's processing time in seconds.
+
+        Returns:
+            True if the level changed
+        """
+        if self.average is None:
+            self.average = frame_time
+        else:
+            self.average += self.smoothing * (frame_time - self.average)
+
+        if not self.enabled:
+            return False
+
+        if self.average > self.budget:
+            self._over += 1
+            self._under = 0
+        elif self.average < self.headroom * self.budget:
+            self._under += 1
+            self._over = 0
+        else:
+            # Inside the dead band - hold the current level
+            self._over = self._under = 0
+
+        if self._over >= self.degrade_after and self.level < self.max_level:
+            return self._set_level(self.level + 1)
+        if self._under >= self.restore_after and self.level > 0:
+            return self._set_level(self.level - 1)
+        return False
+
+    def _set_level(self, level):
+        self.level = level
+        self._over = self._under = 0
+        # Start the average afresh so the new level is judged on its own frames
+        self.average = None
+        return True
+
+    def status(self):
+        """Dictionary describing the controller, e.g. for a status endpoint."""
+        return {
+            'level': self.level,
+            'max_level': self.max_level,
+            'name': self.settings['name'],
+            'target_fps': round(1.0 / self.budget, 2),
+            'frame_ms': round(self.average * 1000.0, 2) if self.average is not None else None,
+            'settings': self.settings,
+        }
+
+    def describe(self):
+        """Short summary for console messages."""
+        return f"load level {self.level}/{self.max_level} ({self.settings['name']})"
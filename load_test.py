@@ -0,0 +1,390 @@
+"""
+Load Test - Find how many viewers the Flask app can serve
+
+Starts app.py in a scratch directory against a camera-free frame source
+(see frame_source), opens N concurrent /video_feed consumers and fires
+/capture requests alongside them. For every step of the sweep it reports:
+
+- delivered FPS for each client and in total;
+- end-to-end frame age (capture to receipt, from the X-Frame-Time part header);
+- server CPU and RSS, sampled from /proc;
+- failed requests.
+
+Slow readers (--read-fps) show how back-pressure from one viewer affects
+the rest. The app's viewers share one capture, so each of N viewers gets
+about 1/N of the source frames. Saturation is therefore judged on the
+total FPS delivered across all viewers, together with frame age and server
+CPU. The first step that misses one of those limits is reported as the
+saturation point.
+
+Usage:
+    python load_test.py --clients 1,2,4,8,16
+    python load_test.py --source captured_smiles --read-fps 0,5 --capture-rate 2
+    python load_test.py --url http://127.0.0.1:5000 --pid 1234    # an already running server
+"""
+
+import argparse
+import http.client
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from frame_source import FPS_ENV_VAR, SOURCE_ENV_VAR
+
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class StreamClient(threading.Thread):
+    """
+    One /video_feed viewer that parses the multipart stream.
+
+    Args:
+        host, port: Server address
+        read_fps: Maximum frames read per second (0 reads as fast as possible)
+    """
+
+    def __init__(self, host, port, read_fps=0.0):
+        super().__init__(daemon=True)
+        self.host = host
+        self.port = port
+        self.read_fps = read_fps
+        self.frames = 0
+        self.ages = []
+        self.error = None
+        self.first = self.last = None
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        try:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=10)
+            conn.request('GET', '/video_feed')
+            response = conn.getresponse()
+            if response.status != 200:
+                self.error = f"HTTP {response.status}"
+                return
+            self._consume(response)
+            conn.close()
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            if not self._stop_event.is_set():
+                self.error = str(e) or type(e).__name__
+
+    def _consume(self, stream):
+        period = 1.0 / self.read_fps if self.read_fps > 0 else 0.0
+        while not self._stop_event.is_set():
+            # Part headers: boundary line, then "Name: value" lines up to a blank line
+            headers = {}
+            while True:
+                line = stream.readline()
+                if not line:
+                    raise ValueError("stream closed by server")
+                line = line.strip()
+                if not line:
+                    if headers:
+                        break
+                    continue
+                if b':' in line:
+                    name, _, value = line.partition(b':')
+                    headers[name.strip().lower()] = value.strip()
+
+            length = int(headers.get(b'content-length', 0))
+            if not length:
+                raise ValueError("part without Content-Length")
+            stream.read(length)
+
+            now = time.time()
+            self.frames += 1
+            self.first = self.first or now
+            self.last = now
+            if b'x-frame-time' in headers:
+                self.ages.append((now - float(headers[b'x-frame-time'])) * 1000.0)
+
+            if period:
+                time.sleep(period)
+
+    def stats(self):
+        duration = (self.last - self.first) if self.first and self.last else 0.0
+        return {
+            'read_fps': self.read_fps,
+            'frames': self.frames,
+            'fps': round((self.frames - 1) / duration, 2) if duration > 0 else 0.0,
+            'age_p50_ms': round(float(np.percentile(self.ages, 50)), 1) if self.ages else None,
+            'age_p95_ms': round(float(np.percentile(self.ages, 95)), 1) if self.ages else None,
+            'error': self.error,
+        }
+
+
+class ProcessSampler(threading.Thread):
+    """Sample a process's CPU use and RSS from /proc."""
+
+    def __init__(self, pid, interval=0.5):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.cpu = []
+        self.rss_mb = []
+        self._stop_event = threading.Event()
+
+    def _cpu_seconds(self):
+        with open(f'/proc/{self.pid}/stat') as f:
+            # Fields after the command name; utime and stime are the 12th and 13th
+            fields = f.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+    def _rss(self):
+        with open(f'/proc/{self.pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024.0
+        return 0.0
+
+    def run(self):
+        try:
+            last_cpu, last_time = self._cpu_seconds(), time.perf_counter()
+            while not self._stop_event.wait(self.interval):
+                cpu, now = self._cpu_seconds(), time.perf_counter()
+                self.cpu.append(100.0 * (cpu - last_cpu) / (now - last_time))
+                self.rss_mb.append(self._rss())
+                last_cpu, last_time = cpu, now
+        except (OSError, ValueError, IndexError):
+            pass  # No /proc (not Linux) or the server exited
+
+    def stop(self):
+        self._stop_event.set()
+
+    def stats(self):
+        return {
+            'cpu_percent': round(float(np.mean(self.cpu)), 1) if self.cpu else None,
+            'rss_mb': round(max(self.rss_mb), 1) if self.rss_mb else None,
+        }
+
+
+def fire_captures(host, port, rate, workers, stop_event, results):
+    """Call /capture at `rate` per second from a pool of `workers` threads until stopped."""
+    def one():
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=10)
+            conn.request('GET', '/capture')
+            response = conn.getresponse()
+            body = response.read()
+            conn.close()
+            ok = response.status == 200 and json.loads(body).get('success')
+            results.append(None if ok else f"HTTP {response.status}: {body[:80]!r}")
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            results.append(str(e) or type(e).__name__)
+
+    period = 1.0 / rate
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while not stop_event.wait(period):
+            pool.submit(one)
+
+
+def start_server(port, source, source_fps, workdir):
+    """
+    Start app.py on a test frame source.
+
+    The app saves /capture photos relative to its working directory, so it
+    runs in workdir to keep test captures out of the real photo folder.
+
+    Args:
+        port: Port to listen on
+        source: Frame source spec (see frame_source)
+        source_fps: Frame source rate
+        workdir: Scratch working directory for the server
+
+    Returns:
+        The server subprocess once it accepts connections, or None
+    """
+    if os.path.exists(source):
+        source = os.path.abspath(source)
+    pythonpath = os.pathsep.join(filter(None, [APP_DIR, os.environ.get('PYTHONPATH')]))
+    env = dict(os.environ, **{SOURCE_ENV_VAR: source, FPS_ENV_VAR: str(source_fps), 'PYTHONPATH': pythonpath})
+    # Run the app object directly - app.py's own entry point uses the debug reloader,
+    # whose extra process would hide the server's CPU and memory
+    code = f"from app import app; app.run(host='127.0.0.1', port={port}, threaded=True)"
+    server = subprocess.Popen([sys.executable, '-c', code], cwd=workdir, env=env)
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if server.poll() is not None:
+            print("Error: The app exited during startup")
+            return None
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/status')
+            conn.getresponse().read()
+            conn.close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    print("Error: The app did not start within 30 seconds")
+    server.terminate()
+    return None
+
+
+def run_step(host, port, pid, clients, read_speeds, duration, warmup, capture_rate, capture_workers):
+    """
+    Run one load level.
+
+    Returns:
+        Dictionary with per-client results and the aggregates for this step
+    """
+    streams = [StreamClient(host, port, read_speeds[i % len(read_speeds)]) for i in range(clients)]
+    for stream in streams:
+        stream.start()
+    time.sleep(warmup)
+
+    # Measure only after the warm-up, so connection setup does not count
+    for stream in streams:
+        stream.frames, stream.ages, stream.first = 0, [], None
+    sampler = ProcessSampler(pid) if pid else None
+    if sampler:
+        sampler.start()
+
+    capture_errors = []
+    stop_captures = threading.Event()
+    capturer = None
+    if capture_rate > 0:
+        capturer = threading.Thread(target=fire_captures, daemon=True,
+                                    args=(host, port, capture_rate, capture_workers, stop_captures, capture_errors))
+        capturer.start()
+
+    time.sleep(duration)
+
+    stop_captures.set()
+    for stream in streams:
+        stream.stop()
+    if sampler:
+        sampler.stop()
+    if capturer:
+        capturer.join()
+    for stream in streams:
+        stream.join(timeout=2)
+
+    per_client = [stream.stats() for stream in streams]
+    fps = [c['fps'] for c in per_client]
+    ages = [age for stream in streams for age in stream.ages]
+    return {
+        'clients': clients,
+        'per_client': per_client,
+        'fps_min': min(fps),
+        'fps_median': round(float(np.median(fps)), 2),
+        'fps_total': round(float(sum(fps)), 2),
+        'age_p50_ms': round(float(np.percentile(ages, 50)), 1) if ages else None,
+        'age_p95_ms': round(float(np.percentile(ages, 95)), 1) if ages else None,
+        'stream_failures': sum(1 for c in per_client if c['error']),
+        'captures': len(capture_errors),
+        'capture_failures': sum(1 for error in capture_errors if error),
+        **(sampler.stats() if sampler else {'cpu_percent': None, 'rss_mb': None}),
+    }
+
+
+def is_saturated(step, target_fps, min_fps_ratio, max_age_ms, max_cpu):
+    """
+    True if a step missed the total FPS, frame-age or CPU limit, or had failures.
+
+    Viewers split the source frames between them, so the server keeps up
+    as long as the frames delivered to all viewers together match the source.
+    """
+    if step['stream_failures'] or step['capture_failures']:
+        return True
+    if step['fps_total'] < min_fps_ratio * target_fps:
+        return True
+    if step['cpu_percent'] is not None and step['cpu_percent'] > max_cpu:
+        return True
+    return step['age_p95_ms'] is not None and step['age_p95_ms'] > max_age_ms
+
+
+def print_step(step):
+    def show(value):
+        return '-' if value is None else value
+    print(f"{step['clients']:>7}{step['fps_total']:>10}{step['fps_median']:>9}{step['fps_min']:>9}{show(step['age_p50_ms']):>10}"
+          f"{show(step['age_p95_ms']):>10}{show(step['cpu_percent']):>8}{show(step['rss_mb']):>9}"
+          f"{step['stream_failures']:>7}{step['capture_failures']:>5}/{step['captures']}")
+    for index, client in enumerate(step['per_client']):
+        if client['error']:
+            print(f"        client {index}: {client['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the Flask app's video stream")
+    parser.add_argument('--clients', default='1,2,4,8,16', help="Comma-separated viewer counts to sweep")
+    parser.add_argument('--read-fps', default='0',
+                        help="Comma-separated read speeds assigned round-robin to viewers (0 = unthrottled)")
+    parser.add_argument('--duration', type=float, default=10, help="Measured seconds per step (default: 10)")
+    parser.add_argument('--warmup', type=float, default=2, help="Seconds before measuring each step (default: 2)")
+    parser.add_argument('--capture-rate', type=float, default=1, help="/capture calls per second (0 disables)")
+    parser.add_argument('--capture-workers', type=int, default=4, help="Parallel /capture requests")
+    parser.add_argument('--source', default='synthetic', help="Frame source: synthetic[:WxH], a video or a folder")
+    parser.add_argument('--source-fps', type=float, default=30, help="Frame source rate (default: 30)")
+    parser.add_argument('--port', type=int, default=5055, help="Port for the started app (default: 5055)")
+    parser.add_argument('--url', default=None, help="Test an already running server instead of starting one")
+    parser.add_argument('--pid', type=int, default=None, help="PID of the --url server, for CPU and RSS")
+    parser.add_argument('--min-fps-ratio', type=float, default=0.9,
+                        help="Saturated when all viewers together get less than this share of the source FPS (default: 0.9)")
+    parser.add_argument('--max-age-ms', type=float, default=250, help="Saturated above this p95 frame age")
+    parser.add_argument('--max-cpu', type=float, default=90,
+                        help="Saturated above this server CPU percent, of one core (default: 90)")
+    parser.add_argument('--json', default=None, help="Write the full results to this file")
+    args = parser.parse_args()
+
+    counts = [int(n) for n in args.clients.split(',')]
+    read_speeds = [float(v) for v in args.read_fps.split(',')]
+
+    server = workdir = None
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port, pid = parts.hostname, parts.port or 80, args.pid
+    else:
+        workdir = tempfile.mkdtemp(prefix='load_test_')
+        server = start_server(args.port, args.source, args.source_fps, workdir)
+        if server is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+            return
+        host, port, pid = '127.0.0.1', args.port, server.pid
+
+    print(f"\n{'CLIENTS':>7}{'FPS TOTAL':>10}{'FPS MED':>9}{'FPS MIN':>9}{'AGE P50':>10}{'AGE P95':>10}{'CPU%':>8}"
+          f"{'RSS MB':>9}{'FAILS':>7}{'CAPTURE FAILS':>14}")
+    steps = []
+    saturation = None
+    try:
+        for clients in counts:
+            step = run_step(host, port, pid, clients, read_speeds, args.duration, args.warmup,
+                            args.capture_rate, args.capture_workers)
+            steps.append(step)
+            print_step(step)
+            if saturation is None and is_saturated(step, args.source_fps, args.min_fps_ratio, args.max_age_ms, args.max_cpu):
+                saturation = clients
+    except KeyboardInterrupt:
+        print("\nInterrupted")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if saturation is None:
+        print(f"\nNo saturation up to {steps[-1]['clients'] if steps else 0} clients")
+    else:
+        print(f"\nSaturated at {saturation} clients")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'saturation': saturation, 'steps': steps}, f, indent=2)
+        print(f"Results saved: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
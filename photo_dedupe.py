@@ -0,0 +1,315 @@
+"""
+Photo Dedupe - Perceptual-hash near-duplicate suppression for captures
+
+Every candidate capture is reduced to a 64-bit difference hash (dHash) over
+the region holding the faces. Hashes are kept in a multi-index hash: one
+exact-match table per 16-bit chunk of the hash. Checking a new photo against
+thousands of earlier ones then only compares it with the photos whose chunks
+are within a bit or two of its own, not with every stored hash.
+
+The live loop uses RecentCaptureIndex to reject near-identical poses before
+they are saved. The same index dedupes an existing folder offline:
+
+    python photo_dedupe.py captured_smiles --move duplicates
+"""
+
+import argparse
+import os
+import shutil
+from collections import deque
+from itertools import combinations
+
+import cv2
+import numpy as np
+
+
+FACE_CASCADE_PATH = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+HASH_BITS = 64  # dhash() with the default hash_size
+
+
+def dhash(gray, hash_size=8):
+    """
+    Compute the difference hash of a grayscale image.
+
+    Args:
+        gray: Grayscale image
+        hash_size: Hash is hash_size * hash_size bits (default 64)
+
+    Returns:
+        The hash as a Python int
+    """
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming(a, b):
+    """Number of differing bits between two hashes."""
+    return (a ^ b).bit_count()
+
+
+def capture_hash(frame, faces=(), margin=0.15):
+    """
+    Hash the part of a photo that matters - the faces.
+
+    The hash covers the box enclosing all faces (plus a margin), so a group
+    holding the same pose hashes the same even if the background flickers.
+    Without faces the whole frame is hashed.
+
+    Args:
+        frame: BGR or grayscale photo
+        faces: Face rectangles (x, y, w, h)
+        margin: Extra border around the faces, as a fraction of the box size
+
+    Returns:
+        64-bit dHash as an int
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+    if len(faces) > 0:
+        height, width = gray.shape[:2]
+        x1 = min(x for (x, y, w, h) in faces)
+        y1 = min(y for (x, y, w, h) in faces)
+        x2 = max(x + w for (x, y, w, h) in faces)
+        y2 = max(y + h for (x, y, w, h) in faces)
+        pad_x = int((x2 - x1) * margin)
+        pad_y = int((y2 - y1) * margin)
+        gray = gray[max(0, y1 - pad_y):min(height, y2 + pad_y), max(0, x1 - pad_x):min(width, x2 + pad_x)]
+
+    return dhash(gray)
+
+
+def _flip_masks(size, max_flips):
+    """XOR masks over size bits, as a list indexed by the number of bits flipped."""
+    masks = [[0]]
+    for flips in range(1, max_flips + 1):
+        masks.append([sum(1 << bit for bit in bits) for bits in combinations(range(size), flips)])
+    return masks
+
+
+class MultiIndexHash:
+    """
+    Multi-index hashing over integer hashes with Hamming distance.
+
+    The hash is split into a few wide chunks (4 x 16 bits by default), each
+    with its own exact-match table. Two hashes within max_distance bits of
+    each other differ in at most max_distance // chunks bits in at least one
+    chunk (pigeonhole principle). A search therefore probes every table with
+    each chunk value within that many bit flips of the query's chunk - 0 to 2
+    flips for a distance of 10 - and only checks the full distance of the
+    entries found. With 16-bit chunks a bucket holds about n / 65536 random
+    hashes, so the candidates stay a small fraction of the index.
+
+    Args:
+        max_distance: Largest search radius the index has to answer
+        bits: Hash length in bits
+        chunks: Number of chunks (about bits / log2 of the expected size)
+    """
+
+    def __init__(self, max_distance=10, bits=HASH_BITS, chunks=4):
+        if not 0 <= max_distance < bits:
+            raise ValueError(f"max_distance must be between 0 and {bits - 1}")
+        if not 1 <= chunks <= bits:
+            raise ValueError(f"chunks must be between 1 and {bits}")
+        self.max_distance = max_distance
+        # Contiguous chunks whose sizes differ by at most one bit
+        self._chunks = []
+        shift = 0
+        for index in range(chunks):
+            size = bits // chunks + (1 if index < bits % chunks else 0)
+            self._chunks.append((shift, (1 << size) - 1))
+            shift += size
+        self._tables = [{} for _ in self._chunks]
+        self._entries = {}  # key -> (hash, item)
+        self._next_key = 0
+        # XOR masks for every chunk size, grouped by how many bits they flip
+        self._flips = {}
+        for _, mask in self._chunks:
+            size = mask.bit_length()
+            if size not in self._flips:
+                self._flips[size] = _flip_masks(size, min(size, max_distance // chunks))
+
+    def _chunk_values(self, value):
+        return [(value >> shift) & mask for shift, mask in self._chunks]
+
+    def add(self, value, item=None):
+        """
+        Insert a hash with an attached item.
+
+        Returns:
+            Key that can be passed to remove()
+        """
+        key = self._next_key
+        self._next_key += 1
+        self._entries[key] = (value, item)
+        for table, chunk in zip(self._tables, self._chunk_values(value)):
+            table.setdefault(chunk, set()).add(key)
+        return key
+
+    def remove(self, key):
+        """Delete an entry added earlier."""
+        value, _ = self._entries.pop(key)
+        for table, chunk in zip(self._tables, self._chunk_values(value)):
+            bucket = table[chunk]
+            bucket.discard(key)
+            if not bucket:
+                del table[chunk]
+
+    def candidates(self, value, max_distance=None):
+        """Keys of every entry whose chunks could put it within max_distance of value."""
+        if max_distance is None:
+            max_distance = self.max_distance
+        radius = max_distance // len(self._chunks)
+        keys = set()
+        for table, (_, mask), chunk in zip(self._tables, self._chunks, self._chunk_values(value)):
+            flips = self._flips[mask.bit_length()]
+            for flip in (m for distance in range(radius + 1) for m in flips[distance]):
+                bucket = table.get(chunk ^ flip)
+                if bucket:
+                    keys.update(bucket)
+        return keys
+
+    def search(self, value, max_distance=None):
+        """
+        Find every stored hash within max_distance of value.
+
+        Args:
+            value: Query hash
+            max_distance: Search radius, at most the one the index was built for
+
+        Returns:
+            List of (distance, hash, item) tuples, closest first
+        """
+        if max_distance is None:
+            max_distance = self.max_distance
+        elif max_distance > self.max_distance:
+            raise ValueError(f"Index only answers distances up to {self.max_distance}")
+
+        results = []
+        for key in self.candidates(value, max_distance):
+            stored, item = self._entries[key]
+            distance = hamming(value, stored)
+            if distance <= max_distance:
+                results.append((distance, stored, item))
+
+        results.sort(key=lambda result: result[0])
+        return results
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RecentCaptureIndex:
+    """
+    Remember the last few captures and spot near-duplicates.
+
+    Args:
+        capacity: How many recent captures to remember
+        threshold: Maximum Hamming distance (out of 64) that counts as a duplicate
+    """
+
+    def __init__(self, capacity=256, threshold=10):
+        self.capacity = capacity
+        self.threshold = threshold
+        self._recent = deque()  # Index keys, oldest first
+        self._index = MultiIndexHash(threshold)
+
+    def find(self, value):
+        """
+        Look up the closest recent capture within the threshold.
+
+        Returns:
+            (distance, label) of the best match, or None
+        """
+        matches = self._index.search(value, self.threshold)
+        if not matches:
+            return None
+        distance, _, label = matches[0]
+        return distance, label
+
+    def is_duplicate(self, value):
+        """True if a recent capture is within the threshold."""
+        return self.find(value) is not None
+
+    def add(self, value, label=None):
+        """Remember a capture, evicting the oldest once over capacity."""
+        self._recent.append(self._index.add(value, label))
+        if len(self._recent) > self.capacity:
+            self._index.remove(self._recent.popleft())
+
+    def __len__(self):
+        return len(self._recent)
+
+
+def dedupe_folder(folder, threshold=10, move_to=None, use_faces=True):
+    """
+    Find near-duplicate photos in a folder, keeping the first of each group.
+
+    Args:
+        folder: Folder with photos
+        threshold: Maximum Hamming distance that counts as a duplicate
+        move_to: Optional folder to move duplicates into
+        use_faces: Hash the face region (as the live loop does) instead of the whole photo
+
+    Returns:
+        List of (duplicate_path, original_path, distance) tuples
+    """
+    face_cascade = cv2.CascadeClassifier(FACE_CASCADE_PATH) if use_faces else None
+    index = MultiIndexHash(threshold)
+    duplicates = []
+
+    names = sorted(name for name in os.listdir(folder)
+                   if name.lower().endswith(('.jpg', '.jpeg', '.png', '.webp')))
+    # Oldest first, so the original is the one that is kept
+    names.sort(key=lambda name: os.path.getmtime(os.path.join(folder, name)))
+
+    for name in names:
+        path = os.path.join(folder, name)
+        gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            print(f"Skipping unreadable file: {path}")
+            continue
+
+        faces = face_cascade.detectMultiScale(gray, scaleFactor=1.3, minNeighbors=5) if face_cascade else ()
+        value = capture_hash(gray, faces)
+
+        matches = index.search(value, threshold)
+        if matches:
+            distance, _, original = matches[0]
+            duplicates.append((path, original, distance))
+            continue
+        index.add(value, path)
+
+    if move_to:
+        os.makedirs(move_to, exist_ok=True)
+        for path, _, _ in duplicates:
+            shutil.move(path, os.path.join(move_to, os.path.basename(path)))
+
+    return duplicates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find near-duplicate captured photos")
+    parser.add_argument('folder', nargs='?', default='captured_smiles', help="Folder to scan")
+    parser.add_argument('--threshold', type=int, default=10, help="Max Hamming distance out of 64 (default: 10)")
+    parser.add_argument('--move', metavar='DIR', default=None, help="Move duplicates into this folder")
+    parser.add_argument('--whole-frame', action='store_true', help="Hash whole photos instead of the face region")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.folder):
+        print(f"Error: Folder not found: {args.folder}")
+        return
+    if not 0 <= args.threshold < HASH_BITS:
+        print(f"Error: --threshold must be between 0 and {HASH_BITS - 1}")
+        return
+
+    duplicates = dedupe_folder(args.folder, args.threshold, args.move, use_faces=not args.whole_frame)
+    for path, original, distance in duplicates:
+        print(f"{path}  ~  {original}  (distance {distance})")
+
+    action = f"moved to {args.move}" if args.move else "found"
+    print(f"\n{len(duplicates)} near-duplicates {action}")
+
+
+if __name__ == "__main__":
+    main()
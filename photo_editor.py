@@ -2,11 +2,13 @@ import cv2
 import numpy as np
 import os
 
+from frame_bus import open_capture
+
 class PhotoEditor:
     def __init__(self):
         self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
         self.smile_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_smile.xml')
-        self.cap = cv2.VideoCapture(0)
+        self.cap = open_capture(0)
         self.current_filter = "normal"
         self.filters = ["normal", "grayscale", "sepia", "warm", "cool", "vintage", "blur"]
     